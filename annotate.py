@@ -12,23 +12,59 @@ Usage:
 """
 
 from __future__ import annotations
-import argparse, shutil
+import argparse, errno, os, shutil
 from pathlib import Path
 from typing import List
 
 import tkinter as tk
 from tkinter import ttk, messagebox
 from PIL import Image, ImageTk
+import PIL.PngImagePlugin      # noqa: F401 – we only ever open track.png
+
+
+CATEGORIES = ("Normal", "Malicious", "Hydro")
+LABELED_MARKER = ".labeled"   # dropped into every folder we have classified
+IMG_CACHE_SIZE = 64           # decoded / resized images kept for navigation
 
 
 # ── helpers ────────────────────────────────────────────────────────────────
 def collect_tracks(root: Path) -> List[Path]:
-    """Return sorted list of .../MMSI/track.png paths."""
-    return sorted(p for p in root.rglob("track.png") if p.is_file())
+    """Return sorted list of .../MMSI/track.png paths.
+
+    Category folders directly under *root* and anything carrying a `.labeled`
+    marker are pruned, so already-annotated trees are never walked again.
+    """
+    found: List[Path] = []
+    stack = [(str(root), True)]   # (directory, is it root itself)
+    while stack:
+        path, at_root = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        if any(e.name == LABELED_MARKER for e in entries):
+            continue
+        for e in entries:
+            if e.is_dir(follow_symlinks=False):
+                if not (at_root and e.name in CATEGORIES):
+                    stack.append((e.path, False))
+            elif e.name == "track.png" and e.is_file():
+                found.append(Path(e.path))
+    return sorted(found)
+
+
+def load_fitted(path: Path, size: tuple[int, int]) -> Image.Image:
+    """Decode *path* already shrunk to fit *size* (never enlarged)."""
+    with Image.open(path) as img:
+        img.draft(None, size)      # let the decoder downscale where it can
+        img.thumbnail(size, Image.LANCZOS)
+        img.load()                 # thumbnail() is a no-op if it already fits: decode before the file closes
+        return img
 
 
 def ensure_demo_dirs(demo_root: Path):
-    for sub in ("Normal", "Malicious", "Hydro"):
+    for sub in CATEGORIES:
         (demo_root / sub).mkdir(parents=True, exist_ok=True)
 
 
@@ -40,6 +76,9 @@ class TrackViewer(tk.Tk):
         self.images = images          # list of track.png paths
         self.demo_root = demo_root
         self.idx = 0
+        self._img_cache: dict[tuple[Path, int, int], Image.Image] = {}
+        self._win_size = (0, 0)
+        self.tk_img: ImageTk.PhotoImage | None = None   # reused via paste()
 
         # --- image label ---------------------------------------------------
         self.pic_label = ttk.Label(self)
@@ -70,6 +109,7 @@ class TrackViewer(tk.Tk):
         # key bindings
         self.bind("<Right>", lambda e: self.next_img())
         self.bind("<Left>",  lambda e: self.prev_img())
+        self.bind("<Configure>", self._on_resize)
 
         self.show_img()
 
@@ -85,25 +125,42 @@ class TrackViewer(tk.Tk):
             self.show_img()
 
     # ---------- rendering --------------------------------------------------
+    def _on_resize(self, event):
+        # resized images are only valid for the window size they were made for
+        if event.widget is self and (event.width, event.height) != self._win_size:
+            self._win_size = (event.width, event.height)
+            self._img_cache.clear()
+
     def show_img(self):
         if not self.images:
             messagebox.showinfo("Done", "No more images to label!")
             self.destroy(); return
 
         img_path = self.images[self.idx]
-        pil_img  = Image.open(img_path)
-
-        # resize to fit current window (or first image size)
-        win_w = self.winfo_width()  or pil_img.width
-        win_h = self.winfo_height() or pil_img.height
-        scale = min(win_w/pil_img.width, win_h/pil_img.height, 1.0)
-        if scale < 1.0:
-            pil_img = pil_img.resize((int(pil_img.width*scale),
-                                      int(pil_img.height*scale)),
-                                     Image.LANCZOS)
 
-        self.tk_img = ImageTk.PhotoImage(pil_img)  # keep reference
-        self.pic_label.configure(image=self.tk_img)
+        # fit to current window (or first image size); the window size is
+        # part of the cache key, so only the first visit pays for decoding
+        win_w = self.winfo_width()
+        win_h = self.winfo_height()
+        key = (img_path, win_w, win_h)
+        pil_img = self._img_cache.get(key)
+        if pil_img is None:
+            if not (win_w and win_h):
+                with Image.open(img_path) as img:   # header only
+                    win_w, win_h = win_w or img.width, win_h or img.height
+            pil_img = load_fitted(img_path, (win_w, win_h))
+            if len(self._img_cache) >= IMG_CACHE_SIZE:
+                self._img_cache.pop(next(iter(self._img_cache)))   # drop oldest
+            self._img_cache[key] = pil_img
+
+        # Tk never frees image slots reliably, so paste into one PhotoImage
+        # and only allocate a new one when the displayed size changes
+        if self.tk_img is None or \
+           (self.tk_img.width(), self.tk_img.height()) != pil_img.size:
+            self.tk_img = ImageTk.PhotoImage(pil_img)  # keep reference
+            self.pic_label.configure(image=self.tk_img)
+        else:
+            self.tk_img.paste(pil_img)
 
         self.counter.configure(
             text=f"{self.idx+1}/{len(self.images)}\n{img_path.parent.name}"
@@ -120,10 +177,17 @@ class TrackViewer(tk.Tk):
         dest_dir = self.demo_root / category / mmsi_dir.name
 
         try:
-            shutil.move(str(mmsi_dir), dest_dir)
-        except shutil.Error as e:
+            try:
+                os.rename(mmsi_dir, dest_dir)      # single rename(2) on same FS
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                shutil.move(str(mmsi_dir), dest_dir)   # cross-device: copy+delete
+            (dest_dir / LABELED_MARKER).touch()
+        except (shutil.Error, OSError) as e:
             messagebox.showerror("Move error", str(e))
-            return
+            if mmsi_dir.exists():     # nothing was moved: stay on this image
+                return
 
         # remove from list and adjust index
         del self.images[self.idx]
@@ -11,21 +11,53 @@ avg_dt_per_mmsi.py
 import csv
 import sys
 import argparse
-from collections import defaultdict
-from datetime import datetime, timezone
+from datetime import datetime
 from pathlib import Path
-from typing import List, Tuple, Dict
+from typing import List, Tuple
 
+import numba
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pac
 import matplotlib.pyplot as plt
 
 
-def parse_iso(ts: str) -> datetime:
-    """Return UTC-aware datetime from ISO string."""
-    return datetime.fromisoformat(ts).replace(tzinfo=timezone.utc)
-
-
-def compute(rows) -> Tuple[List[Tuple[str, float | None, datetime | None]],
-                           float, int, List[float]]:
+def read_ais(src) -> pd.DataFrame:
+    """Load only the MMSI / BaseDateTime columns (timestamps as UTC)."""
+    table = pac.read_csv(src, convert_options=pac.ConvertOptions(
+        include_columns=["MMSI", "BaseDateTime"],
+        column_types={"MMSI": pa.string(), "BaseDateTime": pa.timestamp("s")},
+    ))
+    df = table.to_pandas()
+    df["BaseDateTime"] = df["BaseDateTime"].dt.tz_localize("UTC")
+    return df
+
+
+@numba.njit(parallel=True, cache=True)
+def _group_dt_stats(ts: np.ndarray, starts: np.ndarray, ends: np.ndarray):
+    """Mean / max Δt of every [start, end) slice of the sorted int64 timestamps."""
+    n = len(starts)
+    mean_dt = np.full(n, np.nan)
+    max_dt = np.zeros(n)
+    for g in numba.prange(n):
+        s, e = starts[g], ends[g]
+        if e - s < 2:
+            continue
+        total = 0.0
+        longest = 0.0
+        for i in range(s + 1, e):
+            d = float(ts[i] - ts[i - 1])
+            total += d
+            if d > longest:
+                longest = d
+        mean_dt[g] = total / (e - s - 1)
+        max_dt[g] = longest
+    return mean_dt, max_dt
+
+
+def compute(df: pd.DataFrame) -> Tuple[List[Tuple[str, float | None, datetime | None]],
+                                       float, int, np.ndarray]:
     """
     Returns:
         results  → list of (mmsi, mean_dt, lone_timestamp)
@@ -35,24 +67,30 @@ def compute(rows) -> Tuple[List[Tuple[str, float | None, datetime | None]],
         n_ships  → total distinct MMSIs
         all_dts  → every Δt collected (for histogram)
     """
-    by_mmsi: Dict[str, List[datetime]] = defaultdict(list)
-    for row in rows:
-        by_mmsi[row["MMSI"]].append(parse_iso(row["BaseDateTime"]))
-
-    results, all_dts, max_dt = [], [], 0.0
-    for mmsi, times in by_mmsi.items():
-        times.sort()
-        if len(times) < 2:
-            results.append((mmsi, None, times[0]))
-            continue
+    # one global sort on int64 keys: (MMSI code, epoch seconds); codes follow
+    # first appearance, so results keep the input's MMSI order
+    codes, mmsis = pd.factorize(df["MMSI"], sort=False)
+    ts = df["BaseDateTime"].dt.as_unit("s").astype("int64").to_numpy()
+    order = np.lexsort((ts, codes))
+    codes, ts = codes[order], ts[order]
+
+    # every MMSI is now one contiguous [start, end) slice
+    starts = np.flatnonzero(np.diff(codes, prepend=-1))
+    ends = np.append(starts[1:], len(codes))
+    mean_dts, max_dts = _group_dt_stats(ts, starts, ends)
+
+    # first fix of every MMSI as UTC datetimes, converted in one vectorized call
+    firsts = pd.to_datetime(ts[starts], unit="s", utc=True).to_pydatetime()
 
-        deltas = [(t2 - t1).total_seconds() for t1, t2 in zip(times, times[1:])]
-        mean_dt = sum(deltas) / len(deltas)
-        all_dts.extend(deltas)
-        max_dt = max(max_dt, max(deltas))
-        results.append((mmsi, mean_dt, None))
+    results = [
+        (mmsis[codes[s]], None, first) if e - s < 2 else (mmsis[codes[s]], float(mean_dt), None)
+        for s, e, mean_dt, first in zip(starts, ends, mean_dts, firsts)
+    ]
 
-    return results, max_dt, len(by_mmsi), all_dts
+    # Δt to the previous fix, minus the ones that straddle two MMSIs
+    all_dts = np.delete(np.diff(ts).astype(np.float64), starts[1:] - 1)
+    max_dt = float(max_dts.max()) if max_dts.size else 0.0
+    return results, max_dt, len(starts), all_dts
 
 
 def main() -> None:
@@ -65,10 +103,8 @@ def main() -> None:
     args = parser.parse_args()
 
     # ── read input ────────────────────────────────────────────────────────
-    inp = sys.stdin if args.csv == "-" else open(args.csv, newline="")
-    results, max_dt, n_ships, all_dts = compute(csv.DictReader(inp))
-    if inp is not sys.stdin:
-        inp.close()
+    results, max_dt, n_ships, all_dts = compute(
+        read_ais(sys.stdin.buffer if args.csv == "-" else args.csv))
 
     # ── write output csv ──────────────────────────────────────────────────
     out_path = Path(args.out)
@@ -83,8 +119,12 @@ def main() -> None:
             ])
 
     # ── optional histogram ────────────────────────────────────────────────
-    if args.plot and all_dts:
-        plt.hist(all_dts, bins=50, color='steelblue', edgecolor='black')
+    if args.plot and all_dts.size:
+        # bin up front so matplotlib only ever sees 50 bars, then drop the raw Δts
+        counts, edges = np.histogram(all_dts, bins=50)
+        del all_dts
+        plt.bar(edges[:-1], counts, width=np.diff(edges), align="edge",
+                color='steelblue', edgecolor='black')
         plt.title("Histogram of Δt (seconds)")
         plt.xlabel("Δt (seconds)")
         plt.ylabel("Frequency")
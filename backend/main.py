@@ -1,14 +1,25 @@
-import json
+import logging
+import os
 import random
-from typing import List
+from typing import Any, Dict, List
+
+import aiofiles
+import numpy as np
+import orjson
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, Response
 from routers import ship_routes
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+
+log = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Darkfleet Backend API",
     description="API for managing ship data.",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -24,6 +35,9 @@ app.add_middleware(
     allow_headers=["*"], # Allows all headers
 )
 
+# Coordinate-heavy payloads (cables, tracks) compress very well
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 app.include_router(ship_routes.router, prefix="/api/v1", tags=["ships"])
 
 @app.get("/")
@@ -38,30 +52,44 @@ USA_BOUNDING_BOX = {
     "max_lon": -60.0
 }
 
-def is_point_in_box(point: List[float], box: dict) -> bool:
-    """Checks if a single point [lon, lat] is within the bounding box."""
-    lon, lat = point
-    return box["min_lat"] <= lat <= box["max_lat"] and \
-           box["min_lon"] <= lon <= box["max_lon"]
+def line_string_bounds(line_strings: List[np.ndarray]) -> np.ndarray:
+    """Returns an (N, 4) array of [min_lon, min_lat, max_lon, max_lat] per line string."""
+    if not line_strings:
+        return np.empty((0, 4))
+    return np.array([np.concatenate((arr.min(axis=0), arr.max(axis=0))) for arr in line_strings])
 
-@app.get("/cables", response_model=List[List[List[float]]])
-async def get_cables():
-    """
-    Reads submarine cable coordinate data from a GeoJSON file.
-    Returns a list of line strings that have at least one point within
-    the defined USA bounding box.
-    """
-    try:
-        # Use sync open in async context for simplicity here,
-        # consider aiofiles for production performance
-        with open("data/cable-geo.json", "r") as f:
-            data = json.load(f)
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail="Cable data file not found.")
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="Error parsing cable data file.")
+def line_strings_in_box(line_strings: List[np.ndarray], bounds: np.ndarray, box: dict) -> List[np.ndarray]:
+    """Returns the line strings ([[lon, lat], ...] arrays) with at least one point inside the box."""
+    min_lon, min_lat, max_lon, max_lat = bounds.T
+    # One vectorized pass over the per-line bounds prunes most line strings;
+    # lines whose bounds lie entirely inside the box need no per-point test
+    overlaps = (max_lon >= box["min_lon"]) & (min_lon <= box["max_lon"]) & \
+               (max_lat >= box["min_lat"]) & (min_lat <= box["max_lat"])
+    contained = (min_lon >= box["min_lon"]) & (max_lon <= box["max_lon"]) & \
+                (min_lat >= box["min_lat"]) & (max_lat <= box["max_lat"])
+
+    selected = []
+    for i in np.flatnonzero(overlaps):
+        arr = line_strings[i]
+        if not contained[i]:
+            lon, lat = arr[:, 0], arr[:, 1]
+            inside = (lon >= box["min_lon"]) & (lon <= box["max_lon"]) & \
+                     (lat >= box["min_lat"]) & (lat <= box["max_lat"])
+            if not inside.any():
+                continue
+        selected.append(arr)
+    return selected
+
+CABLE_DATA_PATH = "data/cable-geo.json"
+
+# Encoded /cables payload from the last parse, rebuilt when the file's mtime changes
+_cables_cache: Dict[str, Any] = {"mtime": None, "payload": b"[]"}
 
-    usa_nearby_line_strings: List[List[List[float]]] = []
+def _parse_cables(raw: bytes) -> bytes:
+    """Parses the cable GeoJSON and returns the USA-nearby line strings, JSON-encoded."""
+    data = orjson.loads(raw)
+
+    line_strings: List[np.ndarray] = []
     features = data.get("features", [])
 
     for feature in features:
@@ -70,13 +98,53 @@ async def get_cables():
             multi_line_string_coords = geometry.get("coordinates")
             if multi_line_string_coords:
                 for line_string in multi_line_string_coords:
-                    is_near_usa = False
-                    for point in line_string:
-                        if is_point_in_box(point, USA_BOUNDING_BOX):
-                            is_near_usa = True
-                            break # Found a point in the box, no need to check others in this line string
+                    if line_string:
+                        line_strings.append(np.asarray(line_string, dtype=np.float64))
+
+    bounds = line_string_bounds(line_strings)
+    usa_nearby_line_strings = line_strings_in_box(line_strings, bounds, USA_BOUNDING_BOX)
+    # orjson writes the float64 arrays directly, no per-point Python floats
+    return orjson.dumps(usa_nearby_line_strings, option=orjson.OPT_SERIALIZE_NUMPY)
 
-                    if is_near_usa:
-                        usa_nearby_line_strings.append(line_string)
+async def _load_cables() -> bytes:
+    """Returns the cached payload, re-reading the file without blocking the event loop if it changed."""
+    mtime = os.stat(CABLE_DATA_PATH).st_mtime
+    if _cables_cache["mtime"] != mtime:
+        async with aiofiles.open(CABLE_DATA_PATH, "rb") as f:
+            raw = await f.read()
+        # Decode + filter is CPU-bound; keep it off the event loop
+        _cables_cache["payload"] = await run_in_threadpool(_parse_cables, raw)
+        _cables_cache["mtime"] = mtime
+    return _cables_cache["payload"]
 
-    return usa_nearby_line_strings
+@app.on_event("startup")
+async def warm_cable_cache():
+    """Builds the /cables payload at startup so the first request is already served from cache."""
+    try:
+        await _load_cables()
+    except (FileNotFoundError, orjson.JSONDecodeError) as e:
+        log.warning("Could not pre-load cable data: %s", e)
+
+@app.on_event("startup")
+async def convert_output_track():
+    """Converts output.json to output.npy at startup, so no request ever writes it."""
+    try:
+        await run_in_threadpool(ship_routes.convert_output_json)
+    except (FileNotFoundError, ValueError) as e:
+        log.warning("Could not convert output.json: %s", e)
+
+@app.get("/cables", response_model=List[List[List[float]]])
+async def get_cables():
+    """
+    Reads submarine cable coordinate data from a GeoJSON file.
+    Returns a list of line strings that have at least one point within
+    the defined USA bounding box.
+    """
+    try:
+        # The payload is encoded once per file change; returning it directly
+        # skips response_model validation and re-serialization per request
+        return Response(content=await _load_cables(), media_type="application/json")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Cable data file not found.")
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=500, detail="Error parsing cable data file.")
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 from typing import List, Optional
 
@@ -10,6 +10,9 @@ class ShipData(BaseModel):
     ship_type: str
 
 class ShipMovementData(BaseModel):
+    # Instances are cached across requests (e.g. the demo track): make sharing them safe
+    model_config = ConfigDict(frozen=True)
+
     timestamp: Optional[datetime] = None
     lat: Optional[float] = None
     lon: Optional[float] = None
@@ -17,6 +20,9 @@ class ShipMovementData(BaseModel):
     cog: Optional[float] = None
 
 class ShipMetadata(BaseModel):
+    # Cached by the ship directory scan and shared by every request
+    model_config = ConfigDict(frozen=True)
+
     mmsi: Optional[str] = None
     basedatetime: Optional[datetime] = None
     lat: Optional[float] = None
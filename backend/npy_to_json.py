@@ -1,14 +1,21 @@
+import argparse
 import numpy as np
-import json
+import orjson
 import sys
 
 # Define input and output filenames
 npy_file = 'polylines_1.npy'
 json_file = 'output.json'
+bin_file = 'polylines.bin'
 
-print(f"Attempting to load {npy_file}...")
+parser = argparse.ArgumentParser(description=f"Convert {npy_file} to {json_file}.")
+parser.add_argument("--npy-compact", action="store_true",
+                    help=f"Also write {bin_file}: int32 polyline count, then per polyline "
+                         "an int32 point count followed by float32 coordinate pairs (little-endian)")
+args = parser.parse_args()
 
 try:
+    print(f"Attempting to load {npy_file}...")
     # Load the .npy file
     # allow_pickle=True is required for object arrays but can be insecure
     # if the file is from an untrusted source.
@@ -19,22 +26,45 @@ try:
     # Assuming data is structured like: [polyline1, polyline2, ...]
     # where polylineX = [point1, point2, ...]
     # and pointY = [x, y]
-    # Convert each point (which might be an ndarray) to a list during flattening
-    flattened_points = [point.tolist() for polyline in data for point in polyline]
-    print(f"Flattened data structure. Original items: {len(data)}, Flattened points: {len(flattened_points)}")
+    # Stack every polyline into one contiguous (N, 2) float64 array in a single copy
+    # (the object array may hold nested object arrays, hence the explicit dtype)
+    points = np.concatenate([np.asarray(polyline, dtype=np.float64) for polyline in data], axis=0)
+    lengths = np.array([len(polyline) for polyline in data], dtype=np.int64)
+    del data
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    print(f"Flattened data structure. Original items: {len(lengths)}, Flattened points: {offsets[-1]}")
 
-    # Convert the flattened list to a list (it already is, but ensures compatibility if logic changes)
-    data_list = list(flattened_points) # Using list() constructor for clarity
-    print("Prepared flattened data for JSON serialization.")
-
-    # Write the list to a JSON file
+    # Stream the points to JSON one polyline at a time; orjson serializes each
+    # ndarray slice directly, so neither Python lists nor the whole document
+    # are ever held in memory
     print(f"Writing data to {json_file}...")
-    with open(json_file, 'w') as f:
-        json.dump(data_list, f, indent=4)
-    print(f"Successfully converted {npy_file} to {json_file}")
+    with open(json_file, 'wb') as f:
+        f.write(b'[')
+        first = True
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            if start == end:
+                continue
+            chunk = orjson.dumps(np.ascontiguousarray(points[start:end]), option=orjson.OPT_SERIALIZE_NUMPY)
+            if not first:
+                f.write(b',')
+            f.write(chunk[1:-1])  # strip the slice's own brackets
+            first = False
+        f.write(b']')
+    print(f"Successfully wrote {json_file}")
+
+    if args.npy_compact:
+        # Packed float32 halves the payload and lets a JS client read it
+        # straight into a Float32Array instead of parsing JSON text
+        print(f"Writing compact binary data to {bin_file}...")
+        with open(bin_file, 'wb') as f:
+            f.write(np.array([len(lengths)], dtype='<i4').tobytes())
+            for start, end in zip(offsets[:-1], offsets[1:]):
+                f.write(np.array([end - start], dtype='<i4').tobytes())
+                f.write(np.asarray(points[start:end], dtype='<f4').tobytes())
+        print(f"Successfully wrote {bin_file}")
 
-except FileNotFoundError:
-    print(f"Error: Input file '{npy_file}' not found.", file=sys.stderr)
+except FileNotFoundError as e:
+    print(f"Error: Input file '{e.filename}' not found.", file=sys.stderr)
     sys.exit(1)
 except Exception as e:
     print(f"An error occurred: {e}", file=sys.stderr)
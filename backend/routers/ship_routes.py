@@ -1,12 +1,15 @@
 from fastapi import APIRouter, HTTPException
 from models.ship_models import ShipData, ShipMovementData, ShipMetadata, ShipDetailResponse
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-import json
-from pydantic import ValidationError
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+import orjson
+from pydantic import TypeAdapter, ValidationError
 import os
 from pathlib import Path
 import random
+import logging
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Store Ship Metadata ---
 # In a real application, this would likely come from a database or configuration
@@ -113,196 +116,390 @@ ship_metadata_store: Dict[str, Dict] = {
   }
 }
 
+log = logging.getLogger(__name__)
+
 router = APIRouter()
 
 DATA_DIR = Path("data") # Define the base data directory relative to the workspace root
 
+def _read_json(path) -> Optional[object]:
+    """
+    Opens and decodes a JSON file in one step, returning None if it does not exist.
+    Saves the separate exists() stat call before every open.
+    """
+    try:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return None
+
+# output.npy is a cache of output.json and lives beside it, wherever the server is started from
+OUTPUT_JSON_PATH = Path(__file__).resolve().parent.parent / "output.json"
+OUTPUT_NPY_PATH = OUTPUT_JSON_PATH.with_suffix(".npy")
+
+# 366823870 demo track built from output.npy, shared by every request
+_output_track: Dict[str, Optional[List[ShipMovementData]]] = {"track": None}
+
+def convert_output_json() -> None:
+    """
+    Converts output.json's [[lat, lon], ...] to output.npy, unless the .npy is already
+    newer. Called from the startup hook; the array is written to a temp file and
+    renamed into place, so a reader never sees a half-written output.npy.
+    """
+    try:
+        if os.stat(OUTPUT_NPY_PATH).st_mtime_ns >= os.stat(OUTPUT_JSON_PATH).st_mtime_ns:
+            return
+    except FileNotFoundError:
+        if os.path.exists(OUTPUT_NPY_PATH): # No JSON to convert: keep the existing .npy
+            return
+    with open(OUTPUT_JSON_PATH, 'rb') as f:
+        coords = np.asarray(orjson.loads(f.read()), dtype=np.float64).reshape(-1, 2)
+    tmp_path = OUTPUT_NPY_PATH.with_name(f"{OUTPUT_NPY_PATH.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        np.save(f, coords)
+    os.replace(tmp_path, OUTPUT_NPY_PATH)
+
+def _load_output_track() -> List[ShipMovementData]:
+    """
+    Returns the 366823870 demo track read from output.npy. The ShipMovementData
+    points are built on first use only and reused by later requests.
+    """
+    if _output_track["track"] is None:
+        coordinates = np.load(OUTPUT_NPY_PATH).tolist()
+        start_time = datetime(2024, 1, 1, 10, 0, 0) # Base time for timestamp generation
+        _output_track["track"] = [
+            ShipMovementData(
+                timestamp=start_time + timedelta(minutes=i*5),
+                lat=coord[0],
+                lon=coord[1],
+                sog=0.0,
+                cog=0.0
+            )
+            for i, coord in enumerate(coordinates)
+        ]
+    return _output_track["track"]
+
+ACTIVITY_TYPES = ["hydro", "malicious", "normal"]
+
+# Result of the last full directory scan, keyed on the directory signature below
+_ship_cache: Dict[str, object] = {"signature": None, "ships": [], "index": {}}
+
+def _data_dir_signature() -> Optional[tuple]:
+    """
+    mtimes of the data directory and its activity folders. These change whenever a
+    ship folder is added, removed or moved between activities. None if DATA_DIR is missing.
+    """
+    try:
+        signature = [os.stat(DATA_DIR).st_mtime_ns]
+    except FileNotFoundError:
+        return None
+    for activity in ACTIVITY_TYPES:
+        try:
+            signature.append(os.stat(DATA_DIR / activity).st_mtime_ns)
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+def _refresh_ship_cache() -> None:
+    """Rescans the data directory if its signature changed since the last scan."""
+    signature = _data_dir_signature()
+    if signature is not None and signature == _ship_cache["signature"]:
+        return
+
+    ships, index = _scan_ship_data()
+    _ship_cache["signature"] = signature
+    _ship_cache["ships"] = ships
+    _ship_cache["index"] = index
+
 def load_ship_data() -> List[ShipMetadata]:
     """
     Loads ship metadata from the /data directory structure.
+    The scan result is cached until the directory signature changes.
+    """
+    _refresh_ship_cache()
+    return list(_ship_cache["ships"])
+
+def _find_ship_dir(ship_id: str) -> Optional[Tuple[str, Path]]:
+    """
+    Returns (activity, folder) for a ship from the cached scan, or None if it has no folder.
+    A hit costs one stat to confirm the folder is still there; a miss or a stale entry
+    triggers the usual signature check and rescan.
+    """
+    entry = _ship_cache["index"].get(ship_id)
+    if entry is not None and entry[1].is_dir():
+        return entry
+    _refresh_ship_cache()
+    return _ship_cache["index"].get(ship_id)
+
+_SHIP_LIST_ADAPTER = TypeAdapter(List[ShipMetadata])
+
+def _validate_ships(pending: List[Tuple[str, Dict]]) -> List[ShipMetadata]:
+    """
+    Validates all queued metadata dicts with a single compiled list validator.
+    Falls back to per-ship validation only if some entry is invalid, so bad ships are skipped.
     """
-    print("Starting load_ship_data...") # Log start
-    all_ships_metadata: List[ShipMetadata] = []
+    try:
+        return _SHIP_LIST_ADAPTER.validate_python([data for _, data in pending])
+    except ValidationError:
+        pass
+
+    ships: List[ShipMetadata] = []
+    for source, data in pending:
+        try:
+            ships.append(ShipMetadata(**data))
+        except ValidationError as e:
+            log.error("Validation Error processing %s: %s", source, e)
+    return ships
+
+_TRACK_ADAPTER = TypeAdapter(List[ShipMovementData])
+
+def _track_float(value):
+    """track.json stores some sog/cog values as strings; ones that don't parse count as 0.0."""
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return 0.0
+    return value
+
+def _validate_track(track_data: List[Dict]) -> List[ShipMovementData]:
+    """
+    Builds ShipMovementData for every track point with a single compiled list validator
+    (pydantic parses numeric strings itself). Only if some point fails, e.g. an
+    unparseable sog/cog string, is the track rebuilt point by point with those set to 0.0;
+    points that are still invalid are skipped, so the valid rest of the track is kept.
+    """
+    points = [{
+        'timestamp': point.get('ts'),
+        'lat': point.get('lat'),
+        'lon': point.get('lon'),
+        'sog': point.get('sog', 0.0),
+        'cog': point.get('cog', 0.0),
+    } for point in track_data]
+    try:
+        return _TRACK_ADAPTER.validate_python(points)
+    except ValidationError:
+        pass
+
+    track: List[ShipMovementData] = []
+    for point in points:
+        point['sog'] = _track_float(point['sog'])
+        point['cog'] = _track_float(point['cog'])
+        try:
+            track.append(ShipMovementData(**point))
+        except ValidationError as e:
+            log.error("Skipping invalid track point %s: %s", point, e)
+    return track
+
+def _load_one_ship(activity: str, ship_dir_path: str) -> Optional[Tuple[str, Dict]]:
+    """
+    Reads one ship folder's track.json / metadata.json.
+    Returns (source description, raw metadata dict) ready for validation, or None if nothing usable was found.
+    """
+    ship_id = os.path.basename(ship_dir_path) # Extract ship_id for logging
+    log.debug("Processing ship ID directory: %s in %s", ship_id, activity)
+
+    metadata_path = os.path.join(ship_dir_path, "metadata.json")
+    track_path = os.path.join(ship_dir_path, "track.json")
+
+    track_data = []
+    track_exists = True
+
+    # Load track.json first (if it exists) to potentially use for filling metadata
+    try:
+        track_data = _read_json(track_path)
+        if track_data is None:
+            track_exists = False
+            track_data = []
+        else:
+            log.debug("Successfully loaded track JSON for %s (%s records)", ship_id, len(track_data))
+    except orjson.JSONDecodeError as e:
+        log.error("Error decoding track JSON from %s: %s", track_path, e)
+        track_data = []
+    except Exception as e:
+        log.error("Unexpected error loading track data for %s: %s - %s", ship_id, type(e).__name__, e)
+        track_data = []
+
+    # Load metadata.json if it exists (None if it does not)
+    try:
+        metadata_data = _read_json(metadata_path)
+    except orjson.JSONDecodeError as e:
+        # Log error for corrupted metadata file
+        log.error("Error decoding JSON from %s: %s", metadata_path, e)
+        return None
+    except Exception as e:
+        log.error("Unexpected Error processing %s: %s - %s", metadata_path, type(e).__name__, e)
+        return None
+    metadata_exists = metadata_data is not None
+
+    if metadata_exists:
+        log.debug("Successfully loaded metadata JSON for %s", ship_id)
+        try:
+            # --- Preprocessing Step ---
+            # Convert all field names to lowercase for consistency
+            metadata_data = {k.lower(): v for k, v in metadata_data.items()}
+            log.debug("Converted all field names to lowercase for %s", ship_id)
+
+            # Convert empty strings to None for optional numeric fields
+            if metadata_data.get('draft') == '':
+                log.debug("Preprocessing: Converting empty draft to None for %s", ship_id)
+                metadata_data['draft'] = None
+            if metadata_data.get('cargo') == '':
+                log.debug("Preprocessing: Converting empty cargo to None for %s", ship_id)
+                metadata_data['cargo'] = None
+            # Add similar checks for other optional numeric fields if needed
+
+            # Use the folder name as MMSI if it's missing in metadata
+            if not metadata_data.get('mmsi'):
+                log.debug("Using directory name '%s' as MMSI for %s", ship_id, ship_id)
+                metadata_data['mmsi'] = ship_id
+
+            # Fill in missing metadata fields from track data if available
+            if track_data and len(track_data) > 0:
+                first_track = track_data[0]
+
+                # Use first track point's timestamp for basedatetime if missing
+                if 'basedatetime' not in metadata_data or metadata_data['basedatetime'] is None:
+                    metadata_data['basedatetime'] = first_track.get('ts')
+                    log.debug("Using first track point's timestamp for basedatetime for %s", ship_id)
+
+                # Fill lat/lon if missing in metadata
+                if 'lat' not in metadata_data or metadata_data['lat'] is None:
+                    metadata_data['lat'] = first_track.get('lat')
+                    log.debug("Using first track point's lat for %s", ship_id)
+                if 'lon' not in metadata_data or metadata_data['lon'] is None:
+                    metadata_data['lon'] = first_track.get('lon')
+                    log.debug("Using first track point's lon for %s", ship_id)
+                # Fill sog/cog if missing in metadata
+                if 'sog' not in metadata_data or metadata_data['sog'] is None:
+                    # Convert to float if it's a string
+                    sog_value = first_track.get('sog')
+                    if isinstance(sog_value, str):
+                        try:
+                            sog_value = float(sog_value)
+                        except (ValueError, TypeError):
+                            sog_value = 0.0
+                    metadata_data['sog'] = sog_value
+                    log.debug("Using first track point's sog for %s", ship_id)
+                if 'cog' not in metadata_data or metadata_data['cog'] is None:
+                    # Convert to float if it's a string
+                    cog_value = first_track.get('cog')
+                    if isinstance(cog_value, str):
+                        try:
+                            cog_value = float(cog_value)
+                        except (ValueError, TypeError):
+                            cog_value = 0.0
+                    metadata_data['cog'] = cog_value
+                    log.debug("Using first track point's cog for %s", ship_id)
+
+            # Add the activity field derived from the folder path
+            metadata_data['activity'] = activity
+            log.debug("Added activity '%s' to metadata for %s", activity, ship_id)
+
+            log.debug("Prepared metadata for %s", ship_id)
+            return metadata_path, metadata_data
+
+        except Exception as e: # Catch other potential errors
+            log.error("Unexpected Error processing %s: %s - %s", metadata_path, type(e).__name__, e)
+    else:
+         # Log if metadata.json is missing
+         log.debug("metadata.json not found in %s", ship_dir_path)
+
+         # If metadata.json is missing but track.json exists, create metadata from the first track point
+         if track_data and len(track_data) > 0:
+             log.debug("Creating metadata from track data for %s", ship_id)
+             first_track = track_data[0]
+
+             # Convert string values to appropriate types
+             sog_value = first_track.get('sog', 0.0)
+             if isinstance(sog_value, str):
+                 try:
+                     sog_value = float(sog_value)
+                 except (ValueError, TypeError):
+                     sog_value = 0.0
+
+             cog_value = first_track.get('cog', 0.0)
+             if isinstance(cog_value, str):
+                 try:
+                     cog_value = float(cog_value)
+                 except (ValueError, TypeError):
+                     cog_value = 0.0
+
+             # Create basic metadata from track
+             metadata_data = {
+                 'mmsi': ship_id,
+                 'lat': first_track.get('lat'),
+                 'lon': first_track.get('lon'),
+                 'sog': sog_value,
+                 'cog': cog_value,
+                 'activity': activity,
+                 # Set basedatetime from the track's timestamp
+                 'basedatetime': first_track.get('ts')
+             }
+
+             log.debug("Created metadata from track for %s", ship_id)
+             return f"track data for {ship_id}", metadata_data
+
+    # No need to continue if both files are missing
+    if not metadata_exists and not track_exists:
+        log.debug("Both metadata.json and track.json missing for %s, skipping...", ship_id)
+    return None
+
+def _scan_ship_data() -> Tuple[List[ShipMetadata], Dict[str, Tuple[str, Path]]]:
+    """
+    Walks DATA_DIR/<activity>/<ship_id>/ and builds metadata for every ship.
+    Also returns an index of ship_id -> (activity, folder) for get_ship_detail.
+    """
+    log.debug("Starting load_ship_data...") # Log start
+    # (activity, ship folder path) for every ship folder found
+    ship_dirs: List[Tuple[str, str]] = []
     data_dir_path = Path(DATA_DIR).resolve() # Get absolute path for clarity in logs
-    print(f"Looking for data in directory: {data_dir_path}")
+    log.debug("Looking for data in directory: %s", data_dir_path)
 
     if not data_dir_path.is_dir():
-        print(f"Warning: Data directory '{data_dir_path}' not found or is not a directory.")
-        return all_ships_metadata
+        log.warning("Data directory '%s' not found or is not a directory.", data_dir_path)
+        return [], {}
 
-    for activity_type_dir in data_dir_path.iterdir():
+    # os.scandir yields DirEntry objects whose is_dir() uses the d_type from
+    # the directory listing, so the walk costs no extra stat() per entry
+    with os.scandir(data_dir_path) as activity_entries:
+        activity_type_dirs = list(activity_entries)
+
+    for activity_type_dir in activity_type_dirs:
         if not activity_type_dir.is_dir():
-            print(f"Skipping non-directory item in data folder: {activity_type_dir.name}")
+            log.debug("Skipping non-directory item in data folder: %s", activity_type_dir.name)
             continue # Skip files like .DS_Store
 
         activity = activity_type_dir.name
-        print(f"Processing activity directory: {activity}")
-        if activity not in ["hydro", "malicious", "normal"]:
-            print(f"Warning: Skipping unexpected directory in data folder: {activity_type_dir.name}")
+        log.debug("Processing activity directory: %s", activity)
+        if activity not in ACTIVITY_TYPES:
+            log.warning("Skipping unexpected directory in data folder: %s", activity_type_dir.name)
             continue
 
-        for ship_id_dir in activity_type_dir.iterdir():
+        with os.scandir(activity_type_dir.path) as ship_entries:
+            ship_id_dirs = list(ship_entries)
+
+        for ship_id_dir in ship_id_dirs:
             if not ship_id_dir.is_dir():
-                print(f"Skipping non-directory item in activity folder '{activity}': {ship_id_dir.name}")
+                log.debug("Skipping non-directory item in activity folder '%s': %s", activity, ship_id_dir.name)
                 continue
 
-            ship_id = ship_id_dir.name # Extract ship_id for logging
-            print(f"Processing ship ID directory: {ship_id} in {activity}")
+            ship_dirs.append((activity, ship_id_dir.path))
 
-            metadata_path = ship_id_dir / "metadata.json"
-            track_path = ship_id_dir / "track.json"
+    # Each ship is two small independent file reads: overlap them on a thread pool
+    # (the GIL is released while reading)
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+        pending = [entry for entry in executor.map(lambda args: _load_one_ship(*args), ship_dirs)
+                   if entry is not None]
 
-            # Initialize metadata_data as empty dict in case metadata.json doesn't exist
-            metadata_data = {}
-            track_data = []
+    # A ship id present under several activities resolves in ACTIVITY_TYPES order
+    index: Dict[str, Tuple[str, Path]] = {}
+    for activity, ship_dir_path in sorted(ship_dirs, key=lambda entry: ACTIVITY_TYPES.index(entry[0])):
+        index.setdefault(os.path.basename(ship_dir_path), (activity, Path(ship_dir_path)))
 
-            # Load track.json first (if it exists) to potentially use for filling metadata
-            if track_path.exists():
-                print(f"Found track.json for {ship_id} in {activity}")
-                try:
-                    with open(track_path, 'r') as f:
-                        track_data = json.load(f)
-                        print(f"Successfully loaded track JSON for {ship_id} ({len(track_data)} records)")
-                except json.JSONDecodeError as e:
-                    print(f"Error decoding track JSON from {track_path}: {e}")
-                    track_data = []
-                except Exception as e:
-                    print(f"Unexpected error loading track data for {ship_id}: {type(e).__name__} - {e}")
-                    track_data = []
-
-            # Load metadata.json if it exists
-            if metadata_path.exists():
-                print(f"Found metadata.json for {ship_id} in {activity}")
-                try:
-                    with open(metadata_path, 'r') as f:
-                        metadata_data = json.load(f)
-                        print(f"Successfully loaded metadata JSON for {ship_id}")
-
-                    # --- Preprocessing Step ---
-                    # Convert all field names to lowercase for consistency
-                    metadata_data = {k.lower(): v for k, v in metadata_data.items()}
-                    print(f"Converted all field names to lowercase for {ship_id}")
-
-                    # Convert empty strings to None for optional numeric fields
-                    if metadata_data.get('draft') == '':
-                        print(f"Preprocessing: Converting empty draft to None for {ship_id}")
-                        metadata_data['draft'] = None
-                    if metadata_data.get('cargo') == '':
-                        print(f"Preprocessing: Converting empty cargo to None for {ship_id}")
-                        metadata_data['cargo'] = None
-                    # Add similar checks for other optional numeric fields if needed
-
-                    # Use the folder name as MMSI if it's missing in metadata
-                    if not metadata_data.get('mmsi'):
-                        print(f"Using directory name '{ship_id}' as MMSI for {ship_id}")
-                        metadata_data['mmsi'] = ship_id
-
-                    # Fill in missing metadata fields from track data if available
-                    if track_data and len(track_data) > 0:
-                        first_track = track_data[0]
-
-                        # Use first track point's timestamp for basedatetime if missing
-                        if 'basedatetime' not in metadata_data or metadata_data['basedatetime'] is None:
-                            metadata_data['basedatetime'] = first_track.get('ts')
-                            print(f"Using first track point's timestamp for basedatetime for {ship_id}")
-
-                        # Fill lat/lon if missing in metadata
-                        if 'lat' not in metadata_data or metadata_data['lat'] is None:
-                            metadata_data['lat'] = first_track.get('lat')
-                            print(f"Using first track point's lat for {ship_id}")
-                        if 'lon' not in metadata_data or metadata_data['lon'] is None:
-                            metadata_data['lon'] = first_track.get('lon')
-                            print(f"Using first track point's lon for {ship_id}")
-                        # Fill sog/cog if missing in metadata
-                        if 'sog' not in metadata_data or metadata_data['sog'] is None:
-                            # Convert to float if it's a string
-                            sog_value = first_track.get('sog')
-                            if isinstance(sog_value, str):
-                                try:
-                                    sog_value = float(sog_value)
-                                except (ValueError, TypeError):
-                                    sog_value = 0.0
-                            metadata_data['sog'] = sog_value
-                            print(f"Using first track point's sog for {ship_id}")
-                        if 'cog' not in metadata_data or metadata_data['cog'] is None:
-                            # Convert to float if it's a string
-                            cog_value = first_track.get('cog')
-                            if isinstance(cog_value, str):
-                                try:
-                                    cog_value = float(cog_value)
-                                except (ValueError, TypeError):
-                                    cog_value = 0.0
-                            metadata_data['cog'] = cog_value
-                            print(f"Using first track point's cog for {ship_id}")
-
-                    # Add the activity field derived from the folder path
-                    metadata_data['activity'] = activity
-                    print(f"Added activity '{activity}' to metadata for {ship_id}")
-
-                    # Validate and append
-                    ship_metadata = ShipMetadata(**metadata_data)
-                    all_ships_metadata.append(ship_metadata)
-                    print(f"Successfully validated and added metadata for {ship_id}")
-
-                except json.JSONDecodeError as e:
-                    # Log error for corrupted metadata file
-                    print(f"Error decoding JSON from {metadata_path}: {e}")
-                except ValidationError as e: # Catch Pydantic validation errors specifically
-                    print(f"Validation Error processing {metadata_path}: {e}")
-                except Exception as e: # Catch other potential errors
-                    print(f"Unexpected Error processing {metadata_path}: {type(e).__name__} - {e}")
-            else:
-                 # Log if metadata.json is missing
-                 print(f"Warning: metadata.json not found in {ship_id_dir}")
-
-                 # If metadata.json is missing but track.json exists, create metadata from the first track point
-                 if track_data and len(track_data) > 0:
-                     print(f"Creating metadata from track data for {ship_id}")
-                     first_track = track_data[0]
-
-                     # Convert string values to appropriate types
-                     sog_value = first_track.get('sog', 0.0)
-                     if isinstance(sog_value, str):
-                         try:
-                             sog_value = float(sog_value)
-                         except (ValueError, TypeError):
-                             sog_value = 0.0
-
-                     cog_value = first_track.get('cog', 0.0)
-                     if isinstance(cog_value, str):
-                         try:
-                             cog_value = float(cog_value)
-                         except (ValueError, TypeError):
-                             cog_value = 0.0
-
-                     # Create basic metadata from track
-                     metadata_data = {
-                         'mmsi': ship_id,
-                         'lat': first_track.get('lat'),
-                         'lon': first_track.get('lon'),
-                         'sog': sog_value,
-                         'cog': cog_value,
-                         'activity': activity,
-                         # Set basedatetime from the track's timestamp
-                         'basedatetime': first_track.get('ts')
-                     }
-
-                     try:
-                         # Validate and append
-                         ship_metadata = ShipMetadata(**metadata_data)
-                         all_ships_metadata.append(ship_metadata)
-                         print(f"Successfully created metadata from track for {ship_id}")
-                     except ValidationError as e:
-                         print(f"Validation Error creating metadata from track for {ship_id}: {e}")
-                     except Exception as e:
-                         print(f"Unexpected Error creating metadata from track for {ship_id}: {type(e).__name__} - {e}")
-
-            # No need to continue if both files are missing
-            if not metadata_path.exists() and not track_path.exists():
-                print(f"Both metadata.json and track.json missing for {ship_id}, skipping...")
-
-    print(f"Finished load_ship_data. Total ships loaded: {len(all_ships_metadata)}") # Log end
-    return all_ships_metadata
+    all_ships_metadata = _validate_ships(pending)
+    log.info("Finished load_ship_data. Total ships loaded: %s", len(all_ships_metadata)) # Log end
+    return all_ships_metadata, index
 
 
 @router.get("/ships", response_model=List[ShipMetadata], tags=["ships"])
@@ -321,56 +518,41 @@ async def get_all_ships():
             malicious_ships = [ship for ship in ship_data if ship.activity == "malicious"]
             hydro_ships = [ship for ship in ship_data if ship.activity == "hydro"]
 
-            print(f"Ship counts - Normal: {len(normal_ships)}, Malicious: {len(malicious_ships)}, Hydro: {len(hydro_ships)}")
+            log.info("Ship counts - Normal: %s, Malicious: %s, Hydro: %s", len(normal_ships), len(malicious_ships), len(hydro_ships))
 
             # Shuffle the malicious and hydro ships
             special_ships = malicious_ships + hydro_ships
             random.shuffle(special_ships)
 
             # Determine where to place special ships
-            max_index = min(20, len(ship_data))  # Don't go beyond the end of the list
+            max_index = min(20, len(normal_ships) + len(special_ships))  # Don't go beyond the end of the list
             min_index = min(5, len(normal_ships))  # Make sure we have room for normal ships first
 
-            # Construct the final list
-            # First place normal ships at the beginning
-            result = []
-            if normal_ships:
-                result.extend(normal_ships)
-
-            # Then insert special ships at random positions between min_index and max_index
-            for i, ship in enumerate(special_ships):
-                if i + min_index < max_index:
-                    insert_index = random.randint(min_index, max_index - 1)
-                    # Extend the list if needed
-                    while len(result) <= insert_index:
-                        result.append(None)
-
-                    # Insert the ship, or replace None if already extended
-                    if result[insert_index] is None:
-                        result[insert_index] = ship
-                    else:
-                        result.insert(insert_index, ship)
-                else:
-                    # If we've run out of positions in the range, append to the end
-                    result.append(ship)
-
-            # Remove any None values that might remain
-            result = [ship for ship in result if ship is not None]
-
-            # Add any remaining ships to the end
-            all_ships_set = set(s.mmsi for s in result if s.mmsi)
-            for ship in ship_data:
-                if ship.mmsi and ship.mmsi not in all_ships_set:
-                    result.append(ship)
-
-            print(f"Reordered ships - Total before: {len(ship_data)}, Total after: {len(result)}")
+            # Special ships take distinct random slots in [min_index, max_index);
+            # any that don't fit go to the end
+            slots = max(0, max_index - min_index)
+            in_range, overflow = special_ships[:slots], special_ships[slots:]
+
+            # Construct the final list in one pass: normal ships fill the free slots in order
+            result = [None] * (len(normal_ships) + len(in_range))
+            for index, ship in zip(random.sample(range(min_index, max_index), len(in_range)), in_range):
+                result[index] = ship
+            normal_iter = iter(normal_ships)
+            result = [ship if ship is not None else next(normal_iter) for ship in result]
+            result.extend(overflow)
+
+            # Add any remaining ships (other activity types) to the end
+            if len(result) < len(ship_data):
+                result.extend(ship for ship in ship_data if ship.activity not in ACTIVITY_TYPES)
+
+            log.info("Reordered ships - Total before: %s, Total after: %s", len(ship_data), len(result))
             ship_data = result
 
         # No need to check if ship_data is empty, returning an empty list is valid
         return ship_data
     except Exception as e:
         # Log the exception details
-        print(f"Error loading ship data: {e}") # Consider using proper logging
+        log.error("Error loading ship data: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error loading ship data")
 
 @router.get("/ship-detail/{ship_id}", response_model=ShipDetailResponse)
@@ -382,89 +564,61 @@ async def get_ship_detail(ship_id: str) -> ShipDetailResponse:
     ship_track = []
     metadata_obj = None
 
-    # Look through data directory for this ship
-    for activity in ["hydro", "malicious", "normal"]:
-        ship_dir = DATA_DIR / activity / ship_id
-        if ship_dir.is_dir():
-            found = True
-            activity_type = activity
-
-            # Load metadata
-            metadata_path = ship_dir / "metadata.json"
-            if metadata_path.exists():
-                try:
-                    with open(metadata_path, 'r') as f:
-                        metadata_data = json.load(f)
-
-                    # Process metadata
-                    metadata_data = {k.lower(): v for k, v in metadata_data.items()}
-
-                    # Convert empty strings to None
-                    if metadata_data.get('draft') == '':
-                        metadata_data['draft'] = None
-                    if metadata_data.get('cargo') == '':
-                        metadata_data['cargo'] = None
-
-                    # Ensure MMSI and activity are set
-                    if not metadata_data.get('mmsi'):
-                        metadata_data['mmsi'] = ship_id
-                    metadata_data['activity'] = activity
-
-                    # Create metadata object
-                    metadata_obj = ShipMetadata(**metadata_data)
-                except Exception as e:
-                    print(f"Error loading metadata for ship {ship_id} in {activity}: {e}")
-
-            # Load track data
-            track_path = ship_dir / "track.json"
-            if track_path.exists():
-                try:
-                    with open(track_path, 'r') as f:
-                        track_data = json.load(f)
-
-                    # Convert track data to ShipMovementData objects
-                    for point in track_data:
-                        # Handle possible string values for numeric fields
-                        sog = point.get('sog', 0.0)
-                        if isinstance(sog, str):
-                            try:
-                                sog = float(sog)
-                            except (ValueError, TypeError):
-                                sog = 0.0
-
-                        cog = point.get('cog', 0.0)
-                        if isinstance(cog, str):
-                            try:
-                                cog = float(cog)
-                            except (ValueError, TypeError):
-                                cog = 0.0
-
-                        ship_track.append(ShipMovementData(
-                            timestamp=point.get('ts'),
-                            lat=point.get('lat'),
-                            lon=point.get('lon'),
-                            sog=sog,
-                            cog=cog
-                        ))
-                except Exception as e:
-                    print(f"Error loading track data for ship {ship_id} in {activity}: {e}")
-
-            # If we have metadata but no track, or have track but no metadata, handle accordingly
-            if not metadata_obj and ship_track:
-                # Create metadata from first track point if we have track but no metadata
-                first_point = ship_track[0]
-                metadata_obj = ShipMetadata(
-                    mmsi=ship_id,
-                    lat=first_point.lat,
-                    lon=first_point.lon,
-                    sog=first_point.sog,
-                    cog=first_point.cog,
-                    activity=activity,
-                    basedatetime=first_point.timestamp
-                )
-
-            # Break once we've found the ship
-            break
+    # Look up the ship's folder in the cached directory index
+    entry = _find_ship_dir(ship_id)
+    if entry is not None:
+        activity, ship_dir = entry
+        found = True
+        activity_type = activity
+
+        # Load metadata
+        metadata_path = ship_dir / "metadata.json"
+        try:
+            metadata_data = _read_json(metadata_path)
+            if metadata_data is not None:
+                # Process metadata
+                metadata_data = {k.lower(): v for k, v in metadata_data.items()}
+
+                # Convert empty strings to None
+                if metadata_data.get('draft') == '':
+                    metadata_data['draft'] = None
+                if metadata_data.get('cargo') == '':
+                    metadata_data['cargo'] = None
+
+                # Ensure MMSI and activity are set
+                if not metadata_data.get('mmsi'):
+                    metadata_data['mmsi'] = ship_id
+                metadata_data['activity'] = activity
+
+                # Create metadata object
+                metadata_obj = ShipMetadata(**metadata_data)
+        except Exception as e:
+            log.error("Error loading metadata for ship %s in %s: %s", ship_id, activity, e)
+
+        # Load track data
+        track_path = ship_dir / "track.json"
+        try:
+            track_data = _read_json(track_path)
+
+            # Convert track data to ShipMovementData objects
+            if track_data:   # None: no track.json
+                ship_track = _validate_track(track_data)
+        except Exception as e:
+            log.error("Error loading track data for ship %s in %s: %s", ship_id, activity, e)
+
+        # If we have metadata but no track, or have track but no metadata, handle accordingly
+        if not metadata_obj and ship_track:
+            # Create metadata from first track point if we have track but no metadata
+            first_point = ship_track[0]
+            metadata_obj = ShipMetadata(
+                mmsi=ship_id,
+                lat=first_point.lat,
+                lon=first_point.lon,
+                sog=first_point.sog,
+                cog=first_point.cog,
+                activity=activity,
+                basedatetime=first_point.timestamp
+            )
 
     # If not found in data directory, fall back to in-memory store
     if not found:
@@ -487,20 +641,10 @@ async def get_ship_detail(ship_id: str) -> ShipDetailResponse:
 
         if ship_id == "366823870": # Specific logic for the ship using output.json
             try:
-                with open('output.json', 'r') as f:
-                    coordinates = json.load(f)
-                # Generate ShipMovementData using coordinates from output.json
-                for i, coord in enumerate(coordinates):
-                    ts = start_time + timedelta(minutes=i*5)
-                    ship_track.append(ShipMovementData(
-                        timestamp=ts,
-                        lat=coord[0],
-                        lon=coord[1],
-                        sog=0.0,
-                        cog=0.0
-                    ))
+                # Track built from output.json's coordinates (converted at startup)
+                ship_track = list(_load_output_track())
             except Exception as e:
-                print(f"Error loading output.json for ship {ship_id}: {e}")
+                log.error("Error loading output.json for ship %s: %s", ship_id, e)
         else:
             # --- Use Mock Movement Data for other known ships ---
             mock_start_long = metadata_dict_lower.get("lon", 118.5)
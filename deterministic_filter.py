@@ -6,9 +6,14 @@ Stream-process an AIS CSV, flag each row by deterministic rules,
 and write out a new CSV—without ever holding the whole dataset in memory.
 """
 
-import csv
 import math
-from datetime import datetime, timedelta
+import numba
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pac
+from datetime import timedelta
+from itertools import islice
 from tqdm import tqdm
 
 # ─── thresholds ───────────────────────────────────────────────────────────────
@@ -20,83 +25,160 @@ FREQ_THRESHOLD = timedelta(minutes=10)
 HEADING_JUMP = 45.0                   # degrees
 DISTANCE_KM = 10.0                    # km
 
+BLOCK_BYTES = 64 << 20                # CSV bytes parsed + flagged per batch
+FLAGS = ["flag_speed", "flag_offline", "flag_low_freq",
+         "flag_heading", "flag_distance", "flag_any"]
+RULE_COLUMNS = ["MMSI", "BaseDateTime", "LAT", "LON", "SOG", "COG"]
+
+# ",<speed>,<offline>,<low_freq>,<heading>,<distance>,<any>\r\n" for each of the
+# 32 combinations of the five rule bits (flag_any is set whenever any bit is);
+# \r\n line endings as the csv module writes them
+FLAG_SUFFIX = [
+    b"".join(b",1" if bits >> k & 1 else b",0" for k in range(5)) + (b",1\r\n" if bits else b",0\r\n")
+    for bits in range(32)
+]
+
 # ─── utils ────────────────────────────────────────────────────────────────────
-def haversine(lat1, lon1, lat2, lon2):
-    """Return haversine distance (km) between two points."""
+# fastmath without "nnan": rows with no previous fix carry NaN coordinates
+@numba.njit(cache=True, fastmath={"nsz", "arcp", "contract", "afn", "reassoc"})
+def haversine_arr(lat1, lon1, lat2, lon2):
+    """Return haversine distances (km) between paired points in float32 arrays."""
     R = 6371.0
-    φ1, φ2 = math.radians(lat1), math.radians(lat2)
-    dφ = math.radians(lat2 - lat1)
-    dλ = math.radians(lon2 - lon1)
-    a = math.sin(dφ/2)**2 + math.cos(φ1)*math.cos(φ2)*math.sin(dλ/2)**2
-    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+    out = np.empty(lat1.shape[0], dtype=np.float32)
+    for i in range(lat1.shape[0]):
+        φ1, φ2 = math.radians(lat1[i]), math.radians(lat2[i])
+        dφ = math.radians(lat2[i] - lat1[i])
+        dλ = math.radians(lon2[i] - lon1[i])
+        a = math.sin(dφ/2)**2 + math.cos(φ1)*math.cos(φ2)*math.sin(dλ/2)**2
+        if a > 1.0:                   # float32 rounding can push a past 1
+            a = 1.0
+        out[i] = R * 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+    return out
 
 def in_midnight_allow(hour_min):
     """True if time (in decimal hours) is between 23:30–00:30."""
-    return (hour_min >= ALLOW_START) or (hour_min <= ALLOW_END)
+    # element-wise | rather than `or`: no branch, works on whole arrays
+    return (hour_min >= ALLOW_START) | (hour_min <= ALLOW_END)
+
+def parse_chunk(raw: pd.DataFrame) -> pd.DataFrame:
+    """Typed view of the columns the rules need (raw rows stay untouched)."""
+    return pd.DataFrame({
+        "MMSI": raw["MMSI"],
+        # one C-level parse per distinct string; many fixes share a timestamp
+        "t":    pd.to_datetime(raw["BaseDateTime"], format="ISO8601", cache=True),
+        # float32 is ample for AIS (~1 m, 0.1 kn) and halves the bytes per column
+        "lat":  raw["LAT"].astype(np.float32),
+        "lon":  raw["LON"].astype(np.float32),
+        "sog":  raw["SOG"].replace("", "0").astype(np.float32),
+        "cog":  raw["COG"].replace("", "0").astype(np.float32),
+    })
+
+def flag_chunk(cur: pd.DataFrame, carry: pd.DataFrame):
+    """
+    Flag every row of `cur`. `carry` holds the last fix of each MMSI seen in
+    earlier chunks, so "previous fix" means the same thing as in a row-by-row
+    pass over the file. Returns (rule bits per row as an index into FLAG_SUFFIX,
+    new carry).
+    """
+    combined = pd.concat([carry, cur], ignore_index=True)
+
+    # Stable sort by MMSI code: each vessel's fixes become one contiguous run,
+    # still in file order, so its previous fix is simply the neighbour in the run
+    codes, _ = pd.factorize(combined["MMSI"])
+    order = np.argsort(codes, kind="stable")
+    same = codes[order[1:]] == codes[order[:-1]]
+    prev_idx = np.full(len(combined), -1)
+    prev_idx[order[1:][same]] = order[:-1][same]
+    prev_idx = prev_idx[len(carry):]
+    has_prev = prev_idx >= 0
+
+    # last fix of every run is carried into the next block
+    run_end = np.ones(len(order), dtype=bool)
+    run_end[:-1] = ~same
+    new_carry = combined.iloc[np.sort(order[run_end])]
+
+    def prev(col, missing):
+        return np.where(has_prev, combined[col].to_numpy()[prev_idx], missing)
+
+    t, t0 = cur["t"].to_numpy(), prev("t", np.datetime64("NaT"))
+    Δt = t - t0                                     # NaT where no previous fix
+
+    # rule 1: speed
+    f_speed = cur["sog"].to_numpy() > SOG_MAX
+
+    # rule 2: offline gap outside midnight window
+    # minutes since midnight straight from the epoch value (NaT rows are masked
+    # out by long_gap), instead of separate .dt.hour / .dt.minute extractions
+    h0 = (t0.astype("datetime64[m]").astype(np.int64) % 1440) / 60
+    long_gap = Δt > np.timedelta64(OFFLINE_THRESHOLD)
+    f_off = long_gap & ~in_midnight_allow(h0)
+
+    # rule 3: low frequency
+    f_freq = Δt > np.timedelta64(FREQ_THRESHOLD)
+
+    # rule 4: heading jump (NaN compares False when there is no previous fix)
+    f_head = np.abs(cur["cog"].to_numpy() - prev("cog", np.nan)) > HEADING_JUMP
+
+    # rule 5: distance jump
+    dist = haversine_arr(prev("lat", np.nan), prev("lon", np.nan),
+                         cur["lat"].to_numpy(), cur["lon"].to_numpy())
+    f_dist = dist > DISTANCE_KM
+
+    # aggregate: one bit per rule, in FLAGS order (flag_any follows from bits != 0)
+    bits = (f_speed.astype(np.uint8) | f_off << 1 | f_freq << 2 | f_head << 3 | f_dist << 4)
+    return bits, new_carry
+
+def iter_records(fin):
+    """
+    Raw CSV records of a binary file, line ending stripped, split the way Arrow
+    counts rows: empty lines are skipped and a quoted field may span lines.
+    """
+    for line in fin:
+        if line in (b"\n", b"\r\n"):
+            continue
+        # an odd number of quotes means a quoted field is still open
+        while line.count(b'"') % 2:
+            more = fin.readline()
+            if not more:
+                raise ValueError("unterminated quoted field at end of file")
+            line += more
+        yield line.rstrip(b"\r\n")
 
 # ─── main ─────────────────────────────────────────────────────────────────────
 def stream_flag(input_path, output_path):
-    prev = {}  # MMSI -> (timestamp, lat, lon, cog)
-
-    with open(input_path, newline='') as fin, \
-         open(output_path, 'w', newline='') as fout:
-
-        reader = csv.DictReader(fin)
-        flags = ["flag_speed", "flag_offline", "flag_low_freq",
-                 "flag_heading", "flag_distance", "flag_any"]
-        writer = csv.DictWriter(fout, fieldnames=reader.fieldnames + flags)
-        writer.writeheader()
-
-        for row in tqdm(reader, desc="Processing rows"):
-            m = row["MMSI"]
-            # parse current
-            t = datetime.fromisoformat(row["BaseDateTime"])
-            lat = float(row["LAT"])
-            lon = float(row["LON"])
-            sog = float(row["SOG"]) if row["SOG"] else 0.0
-            cog = float(row["COG"]) if row["COG"] else 0.0
-
-            # rule 1: speed
-            f_speed = sog > SOG_MAX
-
-            # default others
-            f_off = f_freq = f_head = f_dist = False
-
-            if m in prev:
-                t0, lat0, lon0, cog0 = prev[m]
-                Δt = t - t0
-
-                # rule 2: offline gap outside midnight window
-                h0 = t0.hour + t0.minute/60
-                long_gap = Δt > OFFLINE_THRESHOLD
-                f_off = long_gap and not in_midnight_allow(h0)
-
-                # rule 3: low frequency
-                f_freq = Δt > FREQ_THRESHOLD
-
-                # rule 4: heading jump
-                f_head = abs(cog - cog0) > HEADING_JUMP
-
-                # rule 5: distance jump
-                dist = haversine(lat0, lon0, lat, lon)
-                f_dist = dist > DISTANCE_KM
-
-            # aggregate
-            f_any = any([f_speed, f_off, f_freq, f_head, f_dist])
-
-            # write flags into row
-            row.update({
-                "flag_speed":    str(int(f_speed)),
-                "flag_offline":  str(int(f_off)),
-                "flag_low_freq": str(int(f_freq)),
-                "flag_heading":  str(int(f_head)),
-                "flag_distance": str(int(f_dist)),
-                "flag_any":      str(int(f_any)),
-            })
-            writer.writerow(row)
-
-            # update prev
-            prev[m] = (t, lat, lon, cog)
+    # Arrow parses only the rule columns, columnar and multi-threaded, with no
+    # per-row objects. Output rows are the raw input records (see iter_records)
+    # plus a precomputed flag suffix, so no field is
+    # re-quoted or re-formatted. Records are matched to Arrow rows by count, and
+    # any disagreement is an error rather than silently shifted flags
+    reader = pac.open_csv(
+        input_path,
+        read_options=pac.ReadOptions(block_size=BLOCK_BYTES),
+        convert_options=pac.ConvertOptions(
+            include_columns=RULE_COLUMNS,
+            column_types={c: pa.string() for c in RULE_COLUMNS},
+        ),
+    )
+    carry = None
+
+    with open(input_path, 'rb') as fin, open(output_path, 'wb') as fout:
+        header = fin.readline().rstrip(b"\r\n")
+        fout.write(header + b"," + ",".join(FLAGS).encode() + b"\r\n")
+        records = iter_records(fin)
+
+        for batch in tqdm(reader, desc="Processing blocks"):
+            cur = parse_chunk(batch.to_pandas())
+            if carry is None:
+                carry = cur.iloc[:0]
+            bits, carry = flag_chunk(cur, carry)
+            rows = list(islice(records, batch.num_rows))
+            if len(rows) != batch.num_rows:
+                raise ValueError(f"{input_path}: Arrow parsed {batch.num_rows} rows "
+                                 f"but only {len(rows)} raw records remain")
+            fout.write(b"".join(row + FLAG_SUFFIX[b] for row, b in zip(rows, bits.tolist())))
+
+        if next(records, None) is not None:
+            raise ValueError(f"{input_path}: more raw records than rows parsed by Arrow")
 
     print(f"Done → wrote {output_path}")
 
@@ -106,4 +188,4 @@ if __name__ == "__main__":
     p.add_argument("input_csv", help="path to AIS CSV")
     p.add_argument("--output", "-o", default="flagged_stream.csv")
     args = p.parse_args()
-    stream_flag(args.input_csv, args.output)
\ No newline at end of file
+    stream_flag(args.input_csv, args.output)
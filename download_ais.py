@@ -13,15 +13,18 @@ python download_ais.py --year 2022         # or:  python download_ais.py 2022
 
 from __future__ import annotations
 import argparse
+import asyncio
 import os
 import sys
 from datetime import date, timedelta
 
-import requests
+import aiofiles             # pip install aiofiles
+import httpx                # pip install "httpx[http2]"
 from tqdm import tqdm       # pip install tqdm
 
 CHUNK   = 1024 * 1024        # 1 MiB
 TIMEOUT = 60                 # seconds
+WORKERS = 8                  # concurrent downloads
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
@@ -29,42 +32,69 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument("year", nargs="?", default=2021, type=int,
                         help="Calendar year to download (default: 2021)")
+    parser.add_argument("--workers", default=WORKERS, type=int,
+                        help=f"Concurrent downloads (default: {WORKERS})")
     return parser.parse_args()
 
-def download_one(day: date, dest_dir: str, base_url: str, overall: tqdm) -> None:
+async def download_one(day: date, dest_dir: str, base_url: str, overall: tqdm,
+                       client: httpx.AsyncClient, position: int = 1) -> None:
     fname = f"AIS_{day:%Y_%m_%d}.zip"
     url   = f"{base_url}/{fname}"
     path  = os.path.join(dest_dir, fname)
 
-    if os.path.exists(path):            # already present
-        overall.write(f"[SKIP] {fname}")
-        overall.update(1)
-        return
+    existing = os.path.getsize(path) if os.path.exists(path) else 0
 
     try:
-        resp = requests.get(url, stream=True, timeout=TIMEOUT)
-        if resp.status_code != 200:
-            overall.write(f"[MISS] {fname} – HTTP {resp.status_code}")
-            overall.update(1)
-            return
-
-        total = int(resp.headers.get("Content-Length", 0))
-        with open(path, "wb") as fp, tqdm(
-            total=total, unit="B", unit_scale=True, unit_divisor=1024,
-            desc=f"{fname}", position=1, leave=False
-        ) as file_bar:
-            for chunk in resp.iter_content(chunk_size=CHUNK):
-                if chunk:
-                    fp.write(chunk)
-                    file_bar.update(len(chunk))
+        # HEAD tells us whether a local file is complete, a partial left by a killed run,
+        # or bigger than the remote one (stale: start over). Servers that refuse HEAD
+        # (e.g. 405) or omit its Content-Length leave the decision to the GET below
+        head = await client.head(url)
+        if head.status_code == 200 and "Content-Length" in head.headers:
+            remote_size = int(head.headers["Content-Length"])
+            if existing == remote_size:              # already present
+                overall.write(f"[SKIP] {fname}")
+                return
+            if existing > remote_size:
+                existing = 0
+
+        while True:
+            # Resume a partial file from where it stopped instead of byte 0
+            headers = {"Range": f"bytes={existing}-"} if existing else {}
+            async with client.stream("GET", url, headers=headers) as resp:
+                if resp.status_code == 416 and existing:
+                    # Nothing past the local size: complete if the remote size matches
+                    # (Content-Range: bytes */<size>), otherwise download from scratch
+                    if resp.headers.get("Content-Range", "").endswith(f"/{existing}"):
+                        overall.write(f"[SKIP] {fname}")
+                        return
+                    existing = 0
+                    continue
+                if resp.status_code == 206:
+                    mode = "ab"
+                elif resp.status_code == 200:        # server ignored the Range: start over
+                    mode, existing = "wb", 0
+                else:
+                    overall.write(f"[MISS] {fname} – HTTP {resp.status_code}")
+                    return
+
+                total = existing + int(resp.headers.get("Content-Length", 0))
+                with tqdm(
+                    total=total, initial=existing, unit="B", unit_scale=True, unit_divisor=1024,
+                    desc=f"{fname}", position=position, leave=False
+                ) as file_bar:
+                    async with aiofiles.open(path, mode) as fp:
+                        async for chunk in resp.aiter_bytes(CHUNK):
+                            await fp.write(chunk)
+                            file_bar.update(len(chunk))
+            break
 
         overall.write(f"[ OK ] {fname}")
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         overall.write(f"[ERR] {fname} – {e}", file=sys.stderr)
     finally:
         overall.update(1)
 
-def main() -> None:
+async def main_async() -> None:
     args     = parse_args()
     year     = args.year
     base_url = f"https://coast.noaa.gov/htdata/CMSP/AISDataHandler/{year}"
@@ -75,11 +105,28 @@ def main() -> None:
     end   = date(year, 12, 31)
     days  = (end - start).days + 1
 
-    with tqdm(total=days, desc=f"{year} calendar days", position=0) as overall:
-        current = start
-        while current <= end:
-            download_one(current, dest_dir, base_url, overall)
-            current += timedelta(days=1)
+    # All downloads share one event loop and one HTTP/2 client: NOAA requests
+    # are multiplexed over a few TLS connections instead of one handshake per file
+    sem       = asyncio.Semaphore(args.workers)
+    positions = list(range(args.workers, 0, -1))   # free rows for per-file bars
+    limits    = httpx.Limits(max_connections=args.workers)
+    timeout   = httpx.Timeout(TIMEOUT)             # per connect / read, not per file
+
+    async with httpx.AsyncClient(http2=True, limits=limits, timeout=timeout,
+                                 follow_redirects=True) as client:
+        with tqdm(total=days, desc=f"{year} calendar days", position=0) as overall:
+            async def fetch(day: date) -> None:
+                async with sem:
+                    pos = positions.pop()
+                    try:
+                        await download_one(day, dest_dir, base_url, overall, client, pos)
+                    finally:
+                        positions.append(pos)
+
+            await asyncio.gather(*(fetch(start + timedelta(days=i)) for i in range(days)))
+
+def main() -> None:
+    asyncio.run(main_async())
 
 if __name__ == "__main__":
     main()
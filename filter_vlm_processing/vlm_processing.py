@@ -1,37 +1,88 @@
 # natsec-hack-ais/reprocess_candidates.py
 import pandas as pd
 import geopandas as gpd
-from shapely.geometry import Point, LineString, Polygon, MultiPolygon
+import shapely
+import shapely.wkb
+from shapely.geometry import Point, Polygon, MultiPolygon
 import warnings
-import matplotlib.pyplot as plt
+import matplotlib
+matplotlib.use('Agg') # headless: figures are only ever written to PNG
+from matplotlib.figure import Figure
+from PIL import Image, ImageDraw
 import contextily as cx
 import os
-from pyproj import CRS
+from pyproj import CRS, Transformer
 import numpy as np
-from scipy.spatial import distance
+import numba
+import pyarrow as pa
+import pyarrow.csv as pac
+from scipy.spatial import cKDTree
 import glob
 import base64
+import io
 import anthropic
+import httpx
 import csv
 import json
 from datetime import datetime
 import shutil
+import functools
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import repeat
 
 # Suppress warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 warnings.simplefilter(action='ignore', category=pd.errors.SettingWithCopyWarning)
 
+# Above this many points count_self_proximity_hits queries a KD-tree instead of all pairs
+PROXIMITY_KDTREE_MIN_POINTS = 2000
+# ...unless the track has more close pairs than this (pair array memory), then all pairs again
+PROXIMITY_MAX_PAIRS = 5_000_000
+# Concurrent Claude requests in process_trajectories (bounded by API rate limits)
+VLM_MAX_WORKERS = 8
+# Plot render worker processes in process_trajectories (basemap tile fetches are network-bound)
+PLOT_MAX_WORKERS = 16
+# Side of the square canvas fast_plot_for_vlm draws VLM input on
+VLM_IMAGE_SIZE = 512
+# Where load_ais_data keeps cleaned frames; bump the version whenever its
+# columns, dtypes or filters change so older cache files are never served
+PREPROCESSED_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preprocessed_cache')
+PREPROCESSED_CACHE_VERSION = 1
+
 # --- Helper Functions (Copied from process_survey_named_vessels.py) ---
 # These are identical to the functions in the previous script
 
 def load_ais_data(csv_path: str) -> pd.DataFrame:
     """Loads AIS data, parses timestamps, cleans, and sorts."""
     try:
+        # Cleaned output of a previous run on the same file (keyed on its path and
+        # mtime, and on the preprocessing version)
+        path_key = hashlib.sha1(os.path.abspath(csv_path).encode()).hexdigest()[:12]
+        cache_prefix = os.path.join(PREPROCESSED_CACHE_DIR, f"{os.path.basename(csv_path)}.{path_key}.")
+        cache_path = f"{cache_prefix}v{PREPROCESSED_CACHE_VERSION}.{os.path.getmtime(csv_path):.0f}.parquet"
+        if os.path.exists(cache_path):
+            print(f"Loading preprocessed AIS data from {cache_path}...")
+            df = pd.read_parquet(cache_path)
+            df['MMSI'] = df['MMSI'].astype('category') # Parquet may not restore the categorical
+            print(f"Loaded {len(df)} preprocessed data points.")
+            return df
         print(f"Loading AIS data from {csv_path}...")
-        df = pd.read_csv(csv_path, low_memory=False)
+        with open(csv_path, newline='') as f:
+            header = next(csv.reader(f), [])
         required_cols = ['MMSI', 'LAT', 'LON'] # BaseDateTime is optional for this input
-        if not all(col in df.columns for col in required_cols):
+        if not all(col in header for col in required_cols):
              raise ValueError(f"CSV must contain columns: {required_cols}")
+        # Arrow parses only the columns used downstream, typed and multi-threaded
+        wanted = [col for col in ['MMSI', 'LAT', 'LON', 'BaseDateTime', 'SOG'] if col in header]
+        table = pac.read_csv(csv_path, convert_options=pac.ConvertOptions(
+            include_columns=wanted,
+            column_types={'MMSI': pa.string(), 'LAT': pa.float32(), 'LON': pa.float32(), 'SOG': pa.float32()},
+        ))
+        df = table.to_pandas()
+        # MMSI is read as text so one malformed value can't fail the whole file;
+        # non-numeric MMSIs become NaN here and are dropped by the mask below
+        df['MMSI'] = pd.to_numeric(df['MMSI'], errors='coerce')
         
         print("Preprocessing data...")
         # Ensure BaseDateTime exists and handle conversion/missing
@@ -41,19 +92,29 @@ def load_ais_data(csv_path: str) -> pd.DataFrame:
         else: 
              df['BaseDateTime'] = pd.to_datetime(df['BaseDateTime'], errors='coerce')
 
-        df.dropna(subset=['LAT', 'LON', 'MMSI'], inplace=True)
-
-        # Handle MMSI type (might be int or string depending on source)
-        try:
-            df['MMSI'] = df['MMSI'].astype(int)
-        except ValueError:
-             print("Warning: MMSI column contains non-integer values. Treating as string.")
-             df['MMSI'] = df['MMSI'].astype(str)
-
-        df = df[(df['LAT'] >= -90) & (df['LAT'] <= 90) & (df['LON'] >= -180) & (df['LON'] <= 180)]
+        # Missing values and out-of-range positions dropped with one mask
+        # over the raw arrays (MMSI is float64 with NaN for missing or malformed values)
+        lat = df['LAT'].to_numpy()
+        lon = df['LON'].to_numpy()
+        mmsi = df['MMSI'].to_numpy()
+        mask = (np.isfinite(lat) & np.isfinite(lon) & np.isfinite(mmsi)
+                & (lat >= -90) & (lat <= 90) & (lon >= -180) & (lon <= 180))
+        df = df[mask]
+        # Few distinct vessels, many rows: group on compact category codes
+        df['MMSI'] = df['MMSI'].astype('int64').astype('category')
         df = df.reset_index() # Keep original order via index
+        # Sort once so every MMSI's rows are contiguous and already in original order
+        df = df.sort_values(['MMSI', 'index'], kind='mergesort')
 
         print(f"Loaded and preprocessed {len(df)} data points.")
+        try:
+            os.makedirs(PREPROCESSED_CACHE_DIR, exist_ok=True)
+            # Older versions or mtimes of this file are never read again
+            for stale_path in glob.glob(f"{glob.escape(cache_prefix)}*.parquet"):
+                os.remove(stale_path)
+            df.to_parquet(cache_path, compression='zstd')
+        except Exception as cache_err:
+            print(f"Warning: Could not write preprocessed cache {cache_path}: {cache_err}")
         return df
     except FileNotFoundError:
         print(f"Error: File not found at {csv_path}")
@@ -71,62 +132,97 @@ def create_trajectories(df: pd.DataFrame, min_points: int = 2) -> dict:
     if df.empty: return {}
     trajectories = {}
     try:
-        geometry = [Point(xy) for xy in zip(df['LON'], df['LAT'])]
-        gdf = gpd.GeoDataFrame(df, geometry=geometry, crs='EPSG:4326')
-        grouped = gdf.groupby('MMSI')
-        for mmsi, group in grouped:
-            if len(group) >= min_points:
-                # Sort by index (original order) as BaseDateTime might be missing/NaT
-                group = group.sort_values(by='index')
-                trajectory = LineString(group['geometry'].tolist())
-                trajectories[mmsi] = trajectory
+        # All linestrings in one vectorized shapely call over plain coordinate arrays:
+        # no GeoDataFrame, no per-group DataFrame slices, no per-MMSI constructor
+        lon = df['LON'].to_numpy()
+        lat = df['LAT'].to_numpy()
+        # load_ais_data sorted by (MMSI, index): each vessel's rows form one run, in
+        # ascending category code order, already in original order (BaseDateTime might be missing/NaT)
+        codes = df['MMSI'].cat.codes.to_numpy()
+        keep = np.bincount(codes)[codes] >= min_points
+        if keep.any():
+            kept_codes, line_ids = np.unique(codes[keep], return_inverse=True)
+            lines = shapely.linestrings(np.column_stack((lon[keep], lat[keep])), indices=line_ids)
+            trajectories = dict(zip(df['MMSI'].cat.categories[kept_codes], lines))
         print(f"Created {len(trajectories)} trajectories.")
         return trajectories
     except Exception as e:
         print(f"An unexpected error during trajectory creation: {e}")
         return {}
 
-def estimate_utm_crs(lat, lon):
-    """Estimates the UTM CRS based on a latitude and longitude."""
+@functools.lru_cache(maxsize=256)
+def _utm_crs(zone: int, south: bool) -> CRS:
+    """One CRS per UTM zone; most trajectories in a fleet share a handful."""
     return CRS.from_dict({
-        'proj': 'utm', 'zone': int((lon + 180) / 6) + 1, 'south': lat < 0,
+        'proj': 'utm', 'zone': zone, 'south': south,
         'ellps': 'WGS84', 'datum': 'WGS84', 'units': 'm'
     })
 
-def count_self_proximity_hits(trajectory: LineString, proximity_threshold_meters: float = 200.0) -> int:
-    """Counts pairs of non-adjacent points within a threshold distance."""
+def estimate_utm_crs(lat, lon):
+    """Estimates the UTM CRS based on a latitude and longitude."""
+    return _utm_crs(int((lon + 180) / 6) + 1, bool(lat < 0))
+
+@functools.lru_cache(maxsize=256)
+def _transformer_from_wgs84(target_crs) -> Transformer:
+    """Compiled WGS84 -> target_crs transformer, reused across trajectories."""
+    return Transformer.from_crs('EPSG:4326', target_crs, always_xy=True)
+
+# Explicit signature: compiled (or loaded from the on-disk cache) at import, not on
+# the first trajectory, and calls skip the dispatcher's type resolution
+@numba.njit("i8(f4[:, ::1], i8, f4)", cache=True, fastmath=True)
+def _count_hits(coords, window, thr2):
+    """Pairs (i, j) with j - i > window whose squared distance is below thr2."""
+    n = coords.shape[0]
+    c = 0
+    for i in range(n):
+        xi, yi = coords[i, 0], coords[i, 1]
+        # start past the adjacency band instead of testing it per pair
+        for j in range(i + window + 1, n):
+            dx = coords[j, 0] - xi
+            dy = coords[j, 1] - yi
+            if dx * dx + dy * dy < thr2:
+                c += 1
+    return c
+
+def count_self_proximity_hits(projected_coords: np.ndarray, proximity_threshold_meters: float = 200.0) -> int:
+    """Counts pairs of non-adjacent points within a threshold distance.
+    Expects the trajectory's coordinates already projected to a metric CRS."""
     hit_count = 0
-    if trajectory is None or trajectory.is_empty: return hit_count
-    coords_list = list(trajectory.coords)
-    if len(coords_list) < 5: return hit_count
     try:
-        gs = gpd.GeoSeries([trajectory], crs='EPSG:4326')
-        centroid = trajectory.centroid
-        target_crs = 'EPSG:3857'
-        if isinstance(centroid, Point) and not centroid.is_empty:
-            try: target_crs = estimate_utm_crs(centroid.y, centroid.x)
-            except Exception: pass
-        gs_projected = gs.to_crs(target_crs)
-        projected_line = gs_projected.iloc[0]
-        if projected_line is None or projected_line.is_empty: return hit_count
-        coords = np.array(projected_line.coords)
+        coords = np.asarray(projected_coords)
         total_points = len(coords)
         if total_points < 5: return hit_count
         adjacency_window = max(2, int(total_points * 0.1))
-        for i in range(total_points):
-            for j in range(i + 1, total_points):
-                if abs(i - j) <= adjacency_window: continue
-                dist = distance.euclidean(coords[i], coords[j])
-                if dist < proximity_threshold_meters: hit_count += 1
+        threshold_sq = proximity_threshold_meters * proximity_threshold_meters # compared against dx*dx + dy*dy, never sqrt
+        # Centred on the track: metre offsets stay small, so float32 keeps ~cm precision
+        xy = coords[:, :2] - coords[:, :2].mean(axis=0)
+        if total_points > PROXIMITY_KDTREE_MIN_POINTS:
+            # Long tracks: let a KD-tree enumerate the close pairs (i < j) in C, then
+            # drop the adjacency band. Pairs are counted first so a dense cluster
+            # (e.g. a moored vessel) can't materialize a huge pair array
+            tree = cKDTree(xy)
+            n_close = (tree.count_neighbors(tree, proximity_threshold_meters) - total_points) // 2
+            if n_close <= PROXIMITY_MAX_PAIRS:
+                pairs = tree.query_pairs(proximity_threshold_meters, output_type='ndarray')
+                i, j = pairs[:, 0], pairs[:, 1]
+                # query_pairs includes distance == threshold; keep the strict comparison
+                d2 = ((xy[j] - xy[i]) ** 2).sum(axis=1)
+                return int((((j - i) > adjacency_window) & (d2 < threshold_sq)).sum())
+        # Short (or very dense) tracks: compiled pair loop, squared distances, no intermediate arrays
+        # float32 halves the bytes streamed per pair and doubles the SIMD lanes
+        xy32 = np.ascontiguousarray(xy, dtype=np.float32)
+        hit_count = int(_count_hits(xy32, adjacency_window, np.float32(threshold_sq)))
         return hit_count
     except Exception as e:
         print(f"Error counting proximity hits: {e}")
         return 0
 
 def plot_trajectory(mmsi, traj_gs, classification, metrics, plot_filename):
-    """Generates and saves a plot for a single trajectory."""
+    """Generates and saves a plot for a single trajectory. Returns the PNG bytes, or None on failure."""
     try:
-        fig, ax = plt.subplots(figsize=(10, 10))
+        # Pyplot-free figure: nothing to close or leak in long-lived worker processes
+        fig = Figure(figsize=(10, 10))
+        ax = fig.subplots()
         traj_gs.plot(ax=ax, linewidth=1.5, color='red')
         try:
             cx.add_basemap(ax, crs=traj_gs.crs.to_string(), source=cx.providers.OpenStreetMap.Mapnik, zoom='auto')
@@ -139,25 +235,68 @@ def plot_trajectory(mmsi, traj_gs, classification, metrics, plot_filename):
                  f"Length: {length_km:.2f} km, Avg SOG: {avg_sog:.1f} kn, Hits: {proximity_hits}")
         ax.set_title(title)
         ax.set_axis_off()
-        plt.savefig(plot_filename, dpi=150, bbox_inches='tight')
-        plt.close(fig)
-        return True
+        # Render once in memory: the bytes go to disk for archival and straight to the VLM
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', dpi=150, bbox_inches='tight')
+        img_bytes = buf.getvalue()
+        with open(plot_filename, 'wb') as f:
+            f.write(img_bytes)
+        return img_bytes
+    except Exception as e:
+        print(f"MMSI: {mmsi} - Error during plotting: {e}")
+        return None
+
+def fast_plot_for_vlm(coords_xy, plot_filename, size=VLM_IMAGE_SIZE, margin=16):
+    """Draws a trajectory as a red polyline on a white canvas with PIL and saves it as PNG.
+    coords_xy should be roughly equal-scale in x and y. Returns the PNG bytes, or None on failure."""
+    try:
+        xy = np.asarray(coords_xy, dtype=float)
+        lo, hi = xy.min(axis=0), xy.max(axis=0)
+        extent = size - 2 * margin
+        scale = extent / max((hi - lo).max(), 1e-12)
+        # Keep the aspect ratio, centre the track and flip y so north is up
+        px = (xy - lo) * scale + margin + (extent - (hi - lo) * scale) / 2
+        px[:, 1] = size - px[:, 1]
+        img = Image.new('RGB', (size, size), 'white')
+        ImageDraw.Draw(img).line([tuple(p) for p in px], fill='red', width=2)
+        buf = io.BytesIO()
+        img.save(buf, format='PNG')
+        img_bytes = buf.getvalue()
+        with open(plot_filename, 'wb') as f:
+            f.write(img_bytes)
+        return img_bytes
+    except Exception as e:
+        print(f"Error during fast plotting to {plot_filename}: {e}")
+        return None
+
+def render_plot(mmsi, wkb_bytes, classification, metrics, plot_filename):
+    """Renders one classified trajectory (as WKB) to plot_filename. Returns the PNG bytes, or None on failure."""
+    try:
+        traj = shapely.wkb.loads(wkb_bytes)
+        if classification == "Potential Pattern for VLM":
+            # VLM input only needs the track shape: skip matplotlib and basemap tiles
+            lon, lat = np.asarray(traj.coords).T
+            coords_xy = np.column_stack((lon * np.cos(np.radians(lat.mean())), lat))
+            return fast_plot_for_vlm(coords_xy, plot_filename)
+        gs = gpd.GeoSeries([traj], crs='EPSG:4326')
+        return plot_trajectory(mmsi, gs, classification, metrics, plot_filename)
     except Exception as e:
         print(f"MMSI: {mmsi} - Error during plotting: {e}")
-        if 'fig' in locals() and plt.fignum_exists(fig.number): plt.close(fig)
-        return False
+        return None
 
-def encode_image_base64(image_path):
-    """Encodes an image file to base64 for API transmission."""
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+@functools.lru_cache(maxsize=None)
+def get_claude_client(api_key=None):
+    """One Claude client per API key, shared by all VLM worker threads so connections stay alive."""
+    http_client = httpx.Client(limits=httpx.Limits(max_connections=2 * VLM_MAX_WORKERS))
+    if api_key:
+        return anthropic.Anthropic(api_key=api_key, http_client=http_client)
+    return anthropic.Anthropic(http_client=http_client)
 
-def analyze_trajectory_with_claude(image_path, mmsi, api_key=None):
-    """Sends trajectory image to Claude API for hydrographic survey pattern analysis."""
+def analyze_trajectory_with_claude(base64_image, mmsi, api_key=None):
+    """Sends a base64-encoded trajectory PNG to Claude API for hydrographic survey pattern analysis."""
     try:
         # Use provided API key or default to environment variable
-        client = anthropic.Anthropic(api_key=api_key) if api_key else anthropic.Anthropic()
-        base64_image = encode_image_base64(image_path)
+        client = get_claude_client(api_key)
         
         # Prompt text for Claude requesting JSON output
         prompt = """
@@ -233,124 +372,171 @@ def extract_classification(vlm_result):
         print(f"Error extracting classification: {e}")
         return "ERROR"
 
-def process_trajectories(trajectories, ais_df_subset, thresholds, plot_dirs, claude_api_key=None):
+def compute_metrics(mmsi, wkb_bytes, avg_sog, thresholds):
+    """Computes metrics and the filter classification for one trajectory.
+    Runs in a worker process: the geometry arrives as WKB, SOG as the trajectory's mean (NaN if missing).
+    Returns (mmsi, metrics, classification); metrics is None if the trajectory could not be projected,
+    classification is None if processing failed."""
+    metrics = {}
+    try:
+        traj = shapely.wkb.loads(wkb_bytes)
+        # --- Calculate Base Metrics ---
+        metrics['avg_sog'] = avg_sog # Will be NaN if SOG was missing
+
+        centroid = traj.centroid
+        target_crs = 'EPSG:3857'
+        if isinstance(centroid, Point) and not centroid.is_empty:
+           try: target_crs = estimate_utm_crs(centroid.y, centroid.x)
+           except Exception: pass 
+        # Project all coordinates in one vectorized pyproj call with the cached
+        # transformer; length and bbox come straight from the projected array
+        lon, lat = np.asarray(traj.coords).T
+        x, y = _transformer_from_wgs84(target_crs).transform(lon, lat)
+        coords = np.column_stack((x, y))
+        if len(coords) == 0 or not np.isfinite(coords).all():
+             print(f"MMSI: {mmsi} - Could not project trajectory for metrics.")
+             return mmsi, None, None
+        length_meters = np.linalg.norm(np.diff(coords, axis=0), axis=1).sum()
+        metrics['length_km'] = length_meters / 1000.0
+        (minx, miny), (maxx, maxy) = coords.min(axis=0), coords.max(axis=0)
+        metrics['bbox_width_m'] = maxx - minx
+        metrics['bbox_height_m'] = maxy - miny
+        # Reuse the projection above instead of re-projecting inside the helper
+        metrics['proximity_hits'] = count_self_proximity_hits(coords)
+        # --- Apply Simplified Filter Logic ---
+        small = metrics['bbox_width_m'] < thresholds['size'] and metrics['bbox_height_m'] < thresholds['size']
+        many_hits = metrics['proximity_hits'] > thresholds['hits']
+        # Check if avg_sog is NaN before comparing
+        if not pd.isna(metrics['avg_sog']):
+            if metrics['avg_sog'] < thresholds['speed'] and small and many_hits:
+                return mmsi, metrics, "Likely Jitter"
+        elif small and many_hits:
+            # If SOG is missing but size is small and hits are high, still likely jitter
+            return mmsi, metrics, "Likely Jitter (No SOG)"
+
+        # --- Classify based on proximity (if not jitter) ---
+        if metrics['proximity_hits'] > 0:
+            return mmsi, metrics, "Potential Pattern for VLM"
+        return mmsi, metrics, "No Significant Proximity"
+    except Exception as e:
+        print(f"MMSI: {mmsi} - Error during processing loop: {e}")
+        return mmsi, metrics, None
+
+# classification -> (counts key, plot_dirs key)
+CLASSIFICATION_BUCKETS = {
+    "Likely Jitter": ('jitter', 'jitter'),
+    "Likely Jitter (No SOG)": ('jitter', 'jitter'),
+    "Potential Pattern for VLM": ('pattern_vlm', 'pattern'),
+    "No Significant Proximity": ('no_prox', 'no_prox'),
+}
+
+def process_trajectories(trajectories, ais_df_subset, thresholds, plot_dirs, claude_api_key=None, tile_cache_dir=None):
     """Processes trajectories: calculates metrics, classifies, plots, and returns counts AND candidate MMSIs."""
     print("\n--- Re-Filtering Candidate Set for Jitter & Potential Patterns ---") # Updated title
     counts = {'jitter': 0, 'pattern_vlm': 0, 'no_prox': 0, 'processed': 0, 'plotted': 0,
               'likely_survey': 0, 'possible_survey': 0}  # Added counts for new categories
     pattern_mmsis = [] # Still useful to know which ones passed this stage
-    pattern_info = [] # To store pattern VLM analysis results
-    grouped_subset = ais_df_subset.groupby('MMSI')
-    for mmsi, traj in trajectories.items():
-        classification = "Other"
-        plot_dir = None
-        metrics = {}
-        try:
-            # --- Calculate Base Metrics ---
-            gs = gpd.GeoSeries([traj], crs='EPSG:4326')
-            avg_sog = np.nan
-            mmsi_group = grouped_subset.get_group(mmsi)
-            # Check if SOG exists in this specific CSV
-            if 'SOG' in mmsi_group.columns:
-                 avg_sog = mmsi_group['SOG'].mean() # Pandas mean ignores NaN
-            else: print(f"  Warning: MMSI {mmsi} - SOG column missing in input CSV.")
-            metrics['avg_sog'] = avg_sog # Will be NaN if SOG was missing
-
-            centroid = traj.centroid
-            target_crs = 'EPSG:3857'
-            if isinstance(centroid, Point) and not centroid.is_empty:
-               try: target_crs = estimate_utm_crs(centroid.y, centroid.x)
-               except Exception: pass 
-            gs_projected = gs.to_crs(target_crs)
-            projected_line = gs_projected.iloc[0]
-            if not projected_line or projected_line.is_empty:
-                 print(f"MMSI: {mmsi} - Could not project trajectory for metrics.")
-                 continue
-            length_meters = projected_line.length
-            metrics['length_km'] = length_meters / 1000.0
-            minx, miny, maxx, maxy = projected_line.bounds
-            metrics['bbox_width_m'] = maxx - minx
-            metrics['bbox_height_m'] = maxy - miny
-            metrics['proximity_hits'] = count_self_proximity_hits(traj)
-            # --- Apply Simplified Filter Logic ---
-            is_likely_jitter = False
-            # Check if avg_sog is NaN before comparing
-            if not pd.isna(metrics['avg_sog']): 
-                if (metrics['avg_sog'] < thresholds['speed'] and
-                    metrics['bbox_width_m'] < thresholds['size'] and
-                    metrics['bbox_height_m'] < thresholds['size'] and
-                    metrics['proximity_hits'] > thresholds['hits']):
-                    is_likely_jitter = True
-                    classification = "Likely Jitter"
-                    counts['jitter'] += 1
-                    plot_dir = plot_dirs['jitter']
-            elif metrics['bbox_width_m'] < thresholds['size'] and \
-                 metrics['bbox_height_m'] < thresholds['size'] and \
-                 metrics['proximity_hits'] > thresholds['hits']:
-                 # If SOG is missing but size is small and hits are high, still likely jitter
-                 is_likely_jitter = True
-                 classification = "Likely Jitter (No SOG)"
-                 counts['jitter'] += 1
-                 plot_dir = plot_dirs['jitter']
-
-            # --- Classify based on proximity (if not jitter) ---
-            if not is_likely_jitter:
-                if metrics['proximity_hits'] > 0:
-                    classification = "Potential Pattern for VLM"
-                    counts['pattern_vlm'] += 1
+    plot_jobs = [] # (mmsi, trajectory WKB, classification, metrics, plot_filename) to render once metrics are in
+    vlm_jobs = [] # (mmsi, plot_filename, metrics, base64 PNG) to send to the VLM once all plots are done
+    # Check if SOG exists in this specific CSV
+    has_sog = 'SOG' in ais_df_subset.columns
+    if not has_sog: print("  Warning: SOG column missing in input CSV.")
+
+    # Metrics are CPU-bound and independent per MMSI: compute them on all cores.
+    # GEOS objects don't pickle, so trajectories travel as WKB
+    mmsis = list(trajectories)
+    wkbs = (shapely.wkb.dumps(trajectories[mmsi]) for mmsi in mmsis)
+    # Mean SOG of every MMSI in one groupby aggregate (pandas mean ignores NaN)
+    sog_by_mmsi = ais_df_subset.groupby('MMSI', sort=False, observed=True)['SOG'].mean().to_dict() if has_sog else {}
+    sogs = (sog_by_mmsi.get(mmsi, np.nan) for mmsi in mmsis)
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = executor.map(compute_metrics, mmsis, wkbs, sogs, repeat(thresholds), chunksize=16)
+
+        # Classification results in trajectory order
+        for mmsi, metrics, classification in results:
+            if metrics is None: continue # Could not project: skipped
+            if classification is None: # Error already reported by the worker
+                counts['processed'] += 1
+                continue
+            try:
+                count_key, plot_key = CLASSIFICATION_BUCKETS[classification]
+                counts[count_key] += 1
+                plot_dir = plot_dirs[plot_key]
+                if classification == "Potential Pattern for VLM":
                     pattern_mmsis.append(mmsi) # Add to list
-                    plot_dir = plot_dirs['pattern']
-                else:
-                     classification = "No Significant Proximity"
-                     counts['no_prox'] += 1
-                     plot_dir = plot_dirs['no_prox']
-            # --- Print Results ---
-            print(f"MMSI: {mmsi} - Length: {metrics['length_km']:.2f} km, Avg SOG: {metrics['avg_sog']:.1f} knots, BBox: {metrics['bbox_width_m']:.0f}x{metrics['bbox_height_m']:.0f} m, Prox. Hits: {metrics['proximity_hits']} -> {classification}")
-            # --- Plotting ---
-            if plot_dir:
-                # Adjust plot directory based on re-classification
-                plot_filename = os.path.join(plot_dir, f"trajectory_{mmsi}.png")
-                if plot_trajectory(mmsi, gs, classification, metrics, plot_filename):
-                     counts['plotted'] += 1
-                     
-                     # For potential patterns, send to Claude VLM for analysis
-                     if classification == "Potential Pattern for VLM":
-                         print(f"MMSI {mmsi} - Sending to Claude VLM for analysis...")
-                         vlm_result = analyze_trajectory_with_claude(plot_filename, mmsi, api_key=claude_api_key)
-                         print(f"MMSI {mmsi} - Claude VLM result: {vlm_result}")
-                         
-                         # Extract just the classification from the JSON result
-                         survey_classification = extract_classification(vlm_result)
-                         
-                         # Save the result with the trajectory info
-                         pattern_info.append({
-                             'mmsi': mmsi,
-                             'length_km': metrics['length_km'],
-                             'avg_sog': metrics['avg_sog'],
-                             'prox_hits': metrics['proximity_hits'],
-                             'bbox_width_m': metrics['bbox_width_m'],
-                             'bbox_height_m': metrics['bbox_height_m'],
-                             'survey_classification': survey_classification,
-                             'vlm_raw_result': vlm_result
-                         })
-                         
-                         # Copy the plot to the appropriate survey classification folder if applicable
-                         if survey_classification == "LIKELY_SURVEY_PATTERN":
-                             likely_survey_filename = os.path.join(plot_dirs['likely_survey'], f"trajectory_{mmsi}.png")
-                             shutil.copy2(plot_filename, likely_survey_filename)
-                             counts['likely_survey'] += 1
-                             print(f"MMSI {mmsi} - Copied to likely survey patterns folder")
-                         elif survey_classification == "POSSIBLE_SURVEY_PATTERN":
-                             possible_survey_filename = os.path.join(plot_dirs['possible_survey'], f"trajectory_{mmsi}.png")
-                             shutil.copy2(plot_filename, possible_survey_filename)
-                             counts['possible_survey'] += 1
-                             print(f"MMSI {mmsi} - Copied to possible survey patterns folder")
-        except Exception as e:
-            mmsi_str = f"MMSI: {mmsi}" if 'mmsi' in locals() else "Unknown MMSI"
-            print(f"{mmsi_str} - Error during processing loop: {e}")
-            # import traceback
-            # traceback.print_exc()
-        counts['processed'] += 1
+                # --- Print Results ---
+                print(f"MMSI: {mmsi} - Length: {metrics['length_km']:.2f} km, Avg SOG: {metrics['avg_sog']:.1f} knots, BBox: {metrics['bbox_width_m']:.0f}x{metrics['bbox_height_m']:.0f} m, Prox. Hits: {metrics['proximity_hits']} -> {classification}")
+                # --- Plotting (queued, rendered below) ---
+                if plot_dir:
+                    # Adjust plot directory based on re-classification
+                    plot_filename = os.path.join(plot_dir, f"trajectory_{mmsi}.png")
+                    plot_jobs.append((mmsi, shapely.wkb.dumps(trajectories[mmsi]), classification, metrics, plot_filename))
+            except Exception as e:
+                print(f"MMSI: {mmsi} - Error during processing loop: {e}")
+            counts['processed'] += 1
+
+    # --- Plotting ---
+    # Renders are independent and mostly wait on basemap tiles. matplotlib (and
+    # GeoSeries.plot through pyplot) is not thread-safe, so each render runs in a
+    # worker process; map keeps results (and so the VLM queue) in trajectory order
+    initializer, initargs = (cx.set_cache_dir, (tile_cache_dir,)) if tile_cache_dir else (None, ())
+    with ProcessPoolExecutor(max_workers=PLOT_MAX_WORKERS, initializer=initializer, initargs=initargs) as executor:
+        rendered = executor.map(render_plot, *zip(*plot_jobs)) if plot_jobs else []
+        for (mmsi, _, classification, metrics, plot_filename), img_bytes in zip(plot_jobs, rendered):
+            if img_bytes:
+                 counts['plotted'] += 1
+                 # For potential patterns, queue for Claude VLM analysis
+                 if classification == "Potential Pattern for VLM":
+                     image_b64 = base64.b64encode(img_bytes).decode('utf-8')
+                     vlm_jobs.append((mmsi, plot_filename, metrics, image_b64))
+
+    # --- Claude VLM analysis ---
+    # Each call is a network round trip: overlap them, capped to respect API rate limits
+    vlm_results = {}
+    with ThreadPoolExecutor(max_workers=VLM_MAX_WORKERS) as executor:
+        futures = {}
+        for mmsi, plot_filename, metrics, image_b64 in vlm_jobs:
+            print(f"MMSI {mmsi} - Sending to Claude VLM for analysis...")
+            future = executor.submit(analyze_trajectory_with_claude, image_b64, mmsi, api_key=claude_api_key)
+            futures[future] = (mmsi, plot_filename, metrics)
+
+        for future in as_completed(futures):
+            mmsi, plot_filename, metrics = futures[future]
+            try:
+                vlm_result = future.result()
+                print(f"MMSI {mmsi} - Claude VLM result: {vlm_result}")
+
+                # Extract just the classification from the JSON result
+                survey_classification = extract_classification(vlm_result)
+
+                # Save the result with the trajectory info
+                vlm_results[mmsi] = {
+                    'mmsi': mmsi,
+                    'length_km': metrics['length_km'],
+                    'avg_sog': metrics['avg_sog'],
+                    'prox_hits': metrics['proximity_hits'],
+                    'bbox_width_m': metrics['bbox_width_m'],
+                    'bbox_height_m': metrics['bbox_height_m'],
+                    'survey_classification': survey_classification,
+                    'vlm_raw_result': vlm_result
+                }
+
+                # Copy the plot to the appropriate survey classification folder if applicable
+                if survey_classification == "LIKELY_SURVEY_PATTERN":
+                    likely_survey_filename = os.path.join(plot_dirs['likely_survey'], f"trajectory_{mmsi}.png")
+                    shutil.copy2(plot_filename, likely_survey_filename)
+                    counts['likely_survey'] += 1
+                    print(f"MMSI {mmsi} - Copied to likely survey patterns folder")
+                elif survey_classification == "POSSIBLE_SURVEY_PATTERN":
+                    possible_survey_filename = os.path.join(plot_dirs['possible_survey'], f"trajectory_{mmsi}.png")
+                    shutil.copy2(plot_filename, possible_survey_filename)
+                    counts['possible_survey'] += 1
+                    print(f"MMSI {mmsi} - Copied to possible survey patterns folder")
+            except Exception as e:
+                print(f"MMSI: {mmsi} - Error during VLM post-processing: {e}")
+
+    # Keep results in trajectory order regardless of completion order
+    pattern_info = [vlm_results[mmsi] for mmsi, *_ in vlm_jobs if mmsi in vlm_results]
     return counts, pattern_mmsis, pattern_info
 
 def print_summary(counts):
@@ -419,6 +605,8 @@ if __name__ == "__main__":
         'likely_survey': os.path.join(BASE_PLOT_DIR, 'likely_survey_pattern'),
         'possible_survey': os.path.join(BASE_PLOT_DIR, 'possible_survey_pattern')
     }
+    # Basemap tiles are kept on disk and reused across plots and runs
+    TILE_CACHE_DIR = os.path.join(CURRENT_DIR, 'tile_cache')
     # Use the same thresholds as before
     THRESHOLDS = {
         'speed': 1.5, 'size': 500.0, 'hits': 50
@@ -433,6 +621,8 @@ if __name__ == "__main__":
         if not os.path.exists(dir_path):
             print(f"Creating directory: {dir_path}")
             os.makedirs(dir_path)
+    os.makedirs(TILE_CACHE_DIR, exist_ok=True)
+    cx.set_cache_dir(TILE_CACHE_DIR)
 
     # --- Workflow ---
     print(f"Starting reprocessing of candidate trajectories from {CANDIDATE_DATA_PATH}...")
@@ -445,7 +635,7 @@ if __name__ == "__main__":
         if vessel_trajectories:
             print(f"\nSuccessfully created {len(vessel_trajectories)} trajectories from candidate data.")
             # Process, classify, and plot (we don't need to save candidates again)
-            results, _, pattern_info = process_trajectories(vessel_trajectories, candidate_df, THRESHOLDS, PLOT_DIRS, claude_api_key=CLAUDE_API_KEY)
+            results, _, pattern_info = process_trajectories(vessel_trajectories, candidate_df, THRESHOLDS, PLOT_DIRS, claude_api_key=CLAUDE_API_KEY, tile_cache_dir=TILE_CACHE_DIR)
             print_summary(results)
             
             # Save VLM analysis results
@@ -5,6 +5,7 @@ Minimal demo: Transformer-based classifier on dummy data.
 
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 
 # ─────────────────────── model ──────────────────────────────────────────────
 class SelfAttentionPooling(nn.Module):
@@ -17,11 +18,70 @@ class SelfAttentionPooling(nn.Module):
         # h: (B,L,D)   mask: (B,L) bool
         scores = self.att(h)                        # (B,L,1)
         if mask is not None:
-            scores = scores.masked_fill(~mask.unsqueeze(-1), -1e9)
+            # dtype's own minimum: -1e9 overflows fp16 under autocast
+            scores = scores.masked_fill(~mask.unsqueeze(-1), torch.finfo(scores.dtype).min)
         α = torch.softmax(scores, dim=1)            # attention weights
         return torch.sum(α * h, dim=1)              # (B,D)
 
 
+class SDPAttention(nn.Module):
+    """Multi-head self-attention via F.scaled_dot_product_attention (Flash /
+    memory-efficient kernels, no materialized L×L matrix). Parameter names
+    match nn.MultiheadAttention so existing checkpoints still load."""
+    def __init__(self, d_model: int, nhead: int, dropout: float):
+        super().__init__()
+        self.nhead = nhead
+        self.dropout = dropout
+        self.in_proj_weight = nn.Parameter(torch.empty(3 * d_model, d_model))
+        self.in_proj_bias = nn.Parameter(torch.zeros(3 * d_model))
+        self.out_proj = nn.Linear(d_model, d_model)
+        nn.init.xavier_uniform_(self.in_proj_weight)
+        nn.init.zeros_(self.out_proj.bias)
+
+    def forward(self, x, mask=None):
+        # x: (B,L,D)   mask: (B,L) bool, True = real token
+        B, L, D = x.shape
+        qkv = F.linear(x, self.in_proj_weight, self.in_proj_bias)
+        q, k, v = qkv.view(B, L, 3, self.nhead, D // self.nhead).permute(2, 0, 3, 1, 4)
+        attn_mask = mask[:, None, None, :] if mask is not None else None    # (B,1,1,L)
+        y = F.scaled_dot_product_attention(
+            q, k, v, attn_mask=attn_mask, dropout_p=self.dropout if self.training else 0.0
+        )                                           # (B,H,L,D/H)
+        return self.out_proj(y.transpose(1, 2).reshape(B, L, D))
+
+
+class EncoderLayer(nn.Module):
+    """Post-norm encoder layer with nn.TransformerEncoderLayer's defaults and
+    parameter names, but attention through SDPAttention."""
+    def __init__(self, d_model: int, nhead: int, dim_feedforward: int = 2048, dropout: float = 0.1):
+        super().__init__()
+        self.self_attn = SDPAttention(d_model, nhead, dropout)
+        self.linear1 = nn.Linear(d_model, dim_feedforward)
+        self.linear2 = nn.Linear(dim_feedforward, d_model)
+        self.norm1 = nn.LayerNorm(d_model)
+        self.norm2 = nn.LayerNorm(d_model)
+        self.dropout = nn.Dropout(dropout)
+        self.dropout1 = nn.Dropout(dropout)
+        self.dropout2 = nn.Dropout(dropout)
+
+    def forward(self, x, mask=None):
+        x = self.norm1(x + self.dropout1(self.self_attn(x, mask)))
+        ff = self.linear2(self.dropout(F.relu(self.linear1(x))))
+        return self.norm2(x + self.dropout2(ff))
+
+
+class Encoder(nn.Module):
+    """Stack of EncoderLayer (`layers` keeps nn.TransformerEncoder's state_dict keys)."""
+    def __init__(self, d_model: int, nhead: int, num_layers: int):
+        super().__init__()
+        self.layers = nn.ModuleList(EncoderLayer(d_model, nhead) for _ in range(num_layers))
+
+    def forward(self, x, mask=None):
+        for layer in self.layers:
+            x = layer(x, mask)
+        return x
+
+
 class TransformerClassifier(nn.Module):
     def __init__(
         self,
@@ -36,10 +96,7 @@ class TransformerClassifier(nn.Module):
         self.embedding = nn.Linear(input_dim, hidden_dim)
         self.pos = nn.Parameter(torch.randn(1, max_len, hidden_dim))  # learned PE
 
-        enc_layer = nn.TransformerEncoderLayer(
-            d_model=hidden_dim, nhead=num_heads, batch_first=True
-        )
-        self.encoder = nn.TransformerEncoder(enc_layer, num_layers=num_layers)
+        self.encoder = Encoder(hidden_dim, num_heads, num_layers)
 
         self.pool = SelfAttentionPooling(hidden_dim)
         self.fc = nn.Linear(hidden_dim, num_classes)
@@ -47,6 +104,6 @@ class TransformerClassifier(nn.Module):
     def forward(self, x, mask=None):                 # x: (B,L,2)
         B, L, _ = x.shape
         x = self.embedding(x) + self.pos[:, :L]      # add position enc.
-        h = self.encoder(x, src_key_padding_mask=~mask if mask is not None else None)
+        h = self.encoder(x, mask)
         z = self.pool(h, mask)                       # (B,D)
         return self.fc(z)                            # raw logits (B,C)
@@ -1,5 +1,5 @@
 from hydro_classifier import TransformerClassifier
-from trajectory_dataset import TrackDataset, pad_collate
+from trajectory_dataset import TrackDataset, BucketBatchSampler, trim_collate
 
 import torch
 import torch.nn as nn
@@ -15,12 +15,25 @@ import argparse
 def train(args):
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     ds = TrackDataset(args.data)
-    dl = DataLoader(ds, batch_size=args.batch, shuffle=True, collate_fn=pad_collate)
+    # similar-length tracks per batch: attention cost is O(L²), so keep L local
+    dl = DataLoader(ds, batch_sampler=BucketBatchSampler(ds.lengths, args.batch),
+                    collate_fn=trim_collate)
 
-    model = TransformerClassifier().to(device)
+    net = TransformerClassifier().to(device)
+    model = net
+    if args.compile and hasattr(torch, "compile"):
+        # Inductor fuses attention / LayerNorm / MLP kernels; lengths vary per
+        # bucket, so compile for dynamic L instead of recompiling per shape
+        model = torch.compile(net, mode="reduce-overhead", dynamic=True)
     opt = torch.optim.AdamW(model.parameters(), lr=args.lr)
     criterion = nn.CrossEntropyLoss()
 
+    # Mixed precision on GPU: bf16 where supported (no loss scaling needed),
+    # else fp16 with a GradScaler. CPU runs stay in fp32
+    use_amp = device.type == "cuda"
+    amp_dtype = torch.bfloat16 if use_amp and torch.cuda.is_bf16_supported() else torch.float16
+    scaler = torch.amp.GradScaler("cuda", enabled=use_amp and amp_dtype == torch.float16)
+
     for epoch in range(1, args.epochs + 1):
         model.train()
         running_loss = correct = total = 0
@@ -28,10 +41,12 @@ def train(args):
         for x, y, mask in tqdm(dl, desc=f"Epoch {epoch}/{args.epochs}"):
             x, y, mask = x.to(device), y.to(device), mask.to(device)
             opt.zero_grad()
-            logits = model(x, mask)
-            loss = criterion(logits, y)
-            loss.backward()
-            opt.step()
+            with torch.autocast(device_type=device.type, dtype=amp_dtype, enabled=use_amp):
+                logits = model(x, mask)
+                loss = criterion(logits, y)
+            scaler.scale(loss).backward()
+            scaler.step(opt)
+            scaler.update()
 
             running_loss += loss.item() * y.size(0)
             pred = logits.argmax(dim=1)
@@ -44,7 +59,8 @@ def train(args):
 
         if args.ckpt_dir:
             Path(args.ckpt_dir).mkdir(exist_ok=True, parents=True)
-            torch.save(model.state_dict(), f"{args.ckpt_dir}/epoch{epoch:02d}.pt")
+            # eager module's state_dict: same keys as before compile was added
+            torch.save(net.state_dict(), f"{args.ckpt_dir}/epoch{epoch:02d}.pt")
 
 
 if __name__ == "__main__":
@@ -55,4 +71,6 @@ if __name__ == "__main__":
     p.add_argument("--lr", type=float, default=3e-4)
     p.add_argument("--ckpt-dir", default="checkpoints",
                    help="where to save *.pt (omit to skip saving)")
+    p.add_argument("--no-compile", dest="compile", action="store_false",
+                   help="run the model eagerly instead of through torch.compile")
     train(p.parse_args())
\ No newline at end of file
@@ -4,7 +4,7 @@ from typing import List, Tuple
 
 import torch
 import torch.nn as nn
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset, DataLoader, Sampler, default_collate
 from tqdm import tqdm
 
 
@@ -12,13 +12,16 @@ from tqdm import tqdm
 class TrackDataset(Dataset):
     """
     Loads every `track.json` under DemoData/<label>/** and returns
-        sequence   — (seq_len, 2) float32 tensor   [lat, lon]
+        sequence   — (L_max, 2) float32 tensor   [lat, lon], zero-padded
         label_idx  — int in {0,1,2}
+        mask       — (L_max,) bool tensor, True = real token
+    All tracks are padded once at construction into contiguous tensors, so
+    the default collate just stacks views (no per-batch padding loop).
     """
     LABEL2IDX = {"Hydropgraphic": 0, "Malicious": 1, "Normal": 2}
 
     def __init__(self, root_dir: str | Path):
-        self.samples: List[Tuple[torch.Tensor, int]] = []
+        samples: List[Tuple[torch.Tensor, int]] = []
         root = Path(root_dir)
 
         for class_dir in root.iterdir():
@@ -29,11 +32,20 @@ class TrackDataset(Dataset):
             for track_file in class_dir.rglob("track.json"):
                 seq = self._load_track(track_file)          # (L, 2)
                 if len(seq):                                # skip empty files
-                    self.samples.append((seq, y))
+                    samples.append((seq, y))
 
-        if not self.samples:
+        if not samples:
             raise RuntimeError(f"No tracks found under {root}")
 
+        L_max = max(s.size(0) for s, _ in samples)
+        self.X = torch.zeros(len(samples), L_max, 2)
+        self.M = torch.zeros(len(samples), L_max, dtype=torch.bool)   # True = real token
+        self.Y = torch.tensor([y for _, y in samples])
+        self.lengths = torch.tensor([s.size(0) for s, _ in samples])
+        for i, (s, _) in enumerate(samples):
+            self.X[i, : s.size(0)] = s
+            self.M[i, : s.size(0)] = True
+
     @staticmethod
     def _load_track(path: Path) -> torch.Tensor:
         with open(path) as f:
@@ -41,20 +53,41 @@ class TrackDataset(Dataset):
         coords = [[fix["lat"], fix["lon"]] for fix in fixes]
         return torch.tensor(coords, dtype=torch.float32)
 
-    def __len__(self) -> int:          return len(self.samples)
-    def __getitem__(self, i):          return self.samples[i]
+    def __len__(self) -> int:          return len(self.Y)
+    def __getitem__(self, i):          return self.X[i], self.Y[i], self.M[i]
+
+
+class BucketBatchSampler(Sampler):
+    """
+    Yields batches of similar-length tracks: indices are shuffled, cut into
+    pools of `pool_batches` batches, sorted by length inside each pool and
+    split into batches (batch order shuffled again). With trim_collate each
+    batch then pads only to its own longest track instead of the global one.
+    """
+    def __init__(self, lengths: torch.Tensor, batch_size: int, pool_batches: int = 50):
+        self.lengths = lengths
+        self.batch_size = batch_size
+        self.pool = batch_size * pool_batches
 
+    def __iter__(self):
+        perm = torch.randperm(len(self.lengths))
+        batches = []
+        for start in range(0, len(perm), self.pool):
+            chunk = perm[start : start + self.pool]
+            chunk = chunk[torch.argsort(self.lengths[chunk])]
+            batches += [chunk[i : i + self.batch_size].tolist()
+                        for i in range(0, len(chunk), self.batch_size)]
+        for b in torch.randperm(len(batches)).tolist():
+            yield batches[b]
 
-def pad_collate(batch):
-    """Pads variable-length tracks to (B, L_max, 2) and returns a mask."""
-    seqs, labels = zip(*batch)
-    lengths = [s.size(0) for s in seqs]
-    L = max(lengths)
+    def __len__(self) -> int:
+        n = len(self.lengths)
+        full, rest = divmod(n, self.pool)
+        return full * (self.pool // self.batch_size) + -(-rest // self.batch_size)
 
-    x = torch.zeros(len(batch), L, 2)
-    mask = torch.zeros(len(batch), L, dtype=torch.bool)      # True = real token
-    for i, s in enumerate(seqs):
-        x[i, : s.size(0)] = s
-        mask[i, : s.size(0)] = True
-    return x, torch.tensor(labels), mask
 
+def trim_collate(batch):
+    """Stacks pre-padded samples and drops padding beyond the batch's longest track."""
+    x, y, mask = default_collate(batch)
+    L = int(mask.sum(dim=1).max())
+    return x[:, :L], y, mask[:, :L]
@@ -16,7 +16,9 @@ import argparse
 from pathlib import Path
 import itertools
 
-import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.compute as pc
 import matplotlib.pyplot as plt
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
@@ -31,24 +33,21 @@ def parse_args() -> argparse.Namespace:
 
 def main() -> None:
     args = parse_args()
-    df = pd.read_csv(args.csv, low_memory=False)
+    # only the three columns we plot are parsed, not the whole AIS dump
+    tbl = pacsv.read_csv(args.csv, convert_options=pacsv.ConvertOptions(
+        include_columns=["VesselName", "LAT", "LON"],
+        column_types={"VesselName": pa.string()},
+    ))
 
     # --- filter names that contain 'SURVEYOR' -------------------------------
-    mask = df["VesselName"].str.contains("SURVEYOR", case=False, na=False)
-    matched = df.loc[mask, ["VesselName", "LAT", "LON"]]
+    # Arrow substring kernel; null names drop out of the filter
+    mask = pc.match_substring(tbl["VesselName"], "SURVEYOR", ignore_case=True)
+    matched = tbl.filter(mask).to_pandas()
 
     if matched.empty:
         print("No vessel names containing 'SURVEYOR' found.")
         return
 
-    vessel_groups = matched.groupby("VesselName")
-    vessel_names = list(vessel_groups.groups.keys())
-
-    # --- print names --------------------------------------------------------
-    print("Matched vessels:")
-    for name in vessel_names:
-        print(" •", name)
-
     # --- plotting -----------------------------------------------------------
     proj = ccrs.PlateCarree()
     fig = plt.figure(figsize=(11, 6))
@@ -59,14 +58,27 @@ def main() -> None:
     ax.add_feature(cfeature.LAND, facecolor="#f3f3f3")
     ax.add_feature(cfeature.COASTLINE, linewidth=0.5)
 
+    ax.set_rasterization_zorder(1)
+
     # colour cycle (repeat if > 10 vessels)
     colours = itertools.cycle(plt.rcParams["axes.prop_cycle"].by_key()["color"])
 
-    for name, group in vessel_groups:
-        lat = group["LAT"].values
-        lon = group["LON"].values
-        ax.scatter(lon, lat, s=3, transform=proj,
-                   label=name, color=next(colours), alpha=0.75)
+    # project every matched fix once up front; scatter then takes map
+    # coordinates directly instead of reprojecting per vessel on each draw
+    xy = ax.projection.transform_points(ccrs.PlateCarree(), matched["LON"].to_numpy(dtype=float),
+                                        matched["LAT"].to_numpy(dtype=float))
+    matched["x"], matched["y"] = xy[:, 0], xy[:, 1]
+
+    # single groupby sweep (first-seen order, no sort) prints and plots each vessel
+    print("Matched vessels:")
+    for name, group in matched.groupby("VesselName", sort=False):
+        print(" •", name)
+        # rasterized: one image for the point cloud instead of a path per marker
+        # (zorder 0 is below the axes' rasterization zorder; like the default
+        # zorder 1 it draws under the land fill and coastline, Cartopy's 1.5)
+        ax.scatter(group["x"].values, group["y"].values, s=3,
+                   label=name, color=next(colours), alpha=0.75,
+                   rasterized=True, zorder=0)
 
     ax.set_title("AIS positions – vessels containing “SURVEYOR”", fontsize=14)
     ax.legend(fontsize=8, loc="lower left", frameon=True, framealpha=0.9)
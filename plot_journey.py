@@ -10,25 +10,36 @@ save_tracks_to_folders_streaming.py
           ├─ track.json   — ordered list of fixes
           └─ track.png    — auto-zoomed trajectory map
 
-Memory footprint is tiny because no full track (nor the whole CSV)
-is ever resident at once, and each line is appended with a
-one-shot open/close so we never exceed the OS FD limit.
+The CSV is read once. Only fixes of vessels whose name contains
+'survey' are buffered, which is a tiny subset of the rows, so the
+whole CSV is never resident and no intermediate files are written.
 """
 
 from __future__ import annotations
-import csv, json, argparse
-from collections import Counter
+import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Iterator, List
+from typing import List
 
+import numpy as np
+import orjson
 import matplotlib
 matplotlib.use("Agg")                    # headless backend
 import matplotlib.pyplot as plt
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.compute as pc
 from tqdm import tqdm
 
+from plot_poly import decimate
+
+BLOCK_BYTES = 64 << 20                   # CSV bytes parsed per Arrow block
+TRACK_COLUMNS = ["MMSI", "BaseDateTime", "LAT", "LON", "SOG", "COG", "VesselName"]
+
 
 # ── utilities ──────────────────────────────────────────────────────────────
 def parse_args() -> argparse.Namespace:
@@ -41,24 +52,37 @@ def parse_args() -> argparse.Namespace:
     return p.parse_args()
 
 
-def read_rows(csv_path: Path) -> Iterator[dict]:
-    with csv_path.open(newline="") as fh:
-        rdr = csv.DictReader(fh)
-        for row in rdr:
-            yield row
+def read_survey_fixes(csv_path: Path) -> pa.Table:
+    """Stream the CSV with Arrow and keep only rows whose VesselName contains 'survey'."""
+    reader = pacsv.open_csv(
+        csv_path,
+        read_options=pacsv.ReadOptions(block_size=BLOCK_BYTES),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=TRACK_COLUMNS,
+            # coordinates typed on parse; everything else kept verbatim as text
+            column_types={c: pa.float64() if c in ("LAT", "LON") else pa.string()
+                          for c in TRACK_COLUMNS},
+        ),
+    )
+    # predicate + projection per block: only survey rows ever leave Arrow
+    batches = [
+        batch.filter(pc.match_substring(batch.column("VesselName"), "survey", ignore_case=True))
+        for batch in tqdm(reader, desc="Scanning", unit="block")
+    ]
+    return pa.Table.from_batches(batches, schema=reader.schema)
 
 
 def plot_track(pts: list[dict], color: str, out_path: Path) -> None:
-    lats = [p["lat"] for p in pts]
-    lons = [p["lon"] for p in pts]
+    lats = np.array([p["lat"] for p in pts])
+    lons = np.array([p["lon"] for p in pts])
 
     fig, ax = plt.subplots(figsize=(6, 6))  # you can adjust figsize if needed
-    ax.plot(lons, lats, marker="o", markersize=1, linewidth=0.5, color=color)
+    ax.plot(*decimate(lons, lats), marker="o", markersize=1, linewidth=0.5, color=color)
 
-    # Set tight limits with a small margin (e.g., 0.01 degrees)
+    # Set tight limits with a small margin (e.g., 0.01 degrees), from the full track
     margin = 0.01
-    ax.set_xlim(min(lons) - margin, max(lons) + margin)
-    ax.set_ylim(min(lats) - margin, max(lats) + margin)
+    ax.set_xlim(lons.min() - margin, lons.max() + margin)
+    ax.set_ylim(lats.min() - margin, lats.max() + margin)
 
     # Hide axis ticks and labels if you want a cleaner image
     ax.set_xticks([])
@@ -78,59 +102,43 @@ def main() -> None:
     csv_path  = Path(args.csv).expanduser()
     data_root = Path("data"); data_root.mkdir(exist_ok=True)
 
-    # Pass 1: count fixes per MMSI, only if VesselName contains 'survey'
-    print("Scanning once to count MMSIs …")
-    counts: Counter[str] = Counter()
-    vessel_names: dict[str, str] = {}  # To store MMSI -> VesselName mapping
-
-    for row in tqdm(read_rows(csv_path), desc="Counting", unit="row"):
-        vessel_name = row.get("VesselName", "").lower()
-        if "survey" in vessel_name:
-            mmsi = row["MMSI"]
-            counts[mmsi] += 1
-            vessel_names[mmsi] = vessel_name
-
-    keep = {m for m, c in counts.items() if c >= args.min}
+    # Pass 1: one streaming Arrow read; buffer fixes of vessels whose VesselName
+    # contains 'survey' (a tiny subset of all AIS rows, so it fits in RAM)
+    print("Scanning once to collect survey-vessel fixes …")
+    fixes = read_survey_fixes(csv_path)
+    pending: defaultdict[str, list[dict]] = defaultdict(list)
+
+    for m, ts, lat, lon, sog, cog in zip(*(fixes.column(c).to_pylist() for c in TRACK_COLUMNS[:-1])):
+        pending[m].append({
+            "ts": ts,
+            "lat": lat,
+            "lon": lon,
+            "sog": sog,
+            "cog": cog,
+        })
+    del fixes
+
+    # Pass 2: drop vessels with too few fixes (in memory, no second CSV read)
+    keep = {m: pts for m, pts in pending.items() if len(pts) >= args.min}
+    del pending
     print(f"Keeping {len(keep)} MMSIs with ≥{args.min} fixes and 'survey' in VesselName")
 
-    # Pass 2: stream qualifying fixes to per-vessel JSONL (open-append-close)
-    print("Writing qualifying tracks as JSONL …")
-    for row in tqdm(read_rows(csv_path), desc="Streaming", unit="row"):
-        m = row["MMSI"]
-        if m not in keep:
-            continue
-
+    # Pass 3: write JSON, then draw PNGs on all cores (each worker process has
+    # its own matplotlib state; rasterising + PNG compression is CPU-bound)
+    print("Writing JSON and drawing PNGs …")
+    for m, pts in keep.items():
         vessel_dir = data_root / m
         vessel_dir.mkdir(exist_ok=True)
 
-        record = {
-            "ts": row["BaseDateTime"],
-            "lat": float(row["LAT"]),
-            "lon": float(row["LON"]),
-            "sog": row.get("SOG"),
-            "cog": row.get("COG"),
-        }
-
-        # one-shot append ensures we hold zero lingering file-descriptors
-        with (vessel_dir / "track.jsonl").open("a") as fh:
-            fh.write(json.dumps(record) + "\n")
-
-    # Pass 3: finalise JSON + draw PNGs
-    print("Finalising JSON and drawing PNGs …")
-    for m in tqdm(keep, desc="Rendering", unit="vessel"):
-        vessel_dir = data_root / m
-        jsonl_path = vessel_dir / "track.jsonl"
-
-        with jsonl_path.open() as fh:
-            pts = [json.loads(line) for line in fh]
-
         # pretty JSON
-        (vessel_dir / "track.json").write_text(json.dumps(pts, indent=2))
-
-        # trajectory PNG
-        plot_track(pts, args.color, vessel_dir / "track.png")
-
-        jsonl_path.unlink()   # delete intermediate file to save space
+        (vessel_dir / "track.json").write_bytes(orjson.dumps(pts, option=orjson.OPT_INDENT_2))
+
+    # trajectory PNGs
+    with ProcessPoolExecutor() as ex:
+        futures = [ex.submit(plot_track, pts, args.color, data_root / m / "track.png")
+                   for m, pts in keep.items()]
+        for fut in tqdm(as_completed(futures), total=len(futures), desc="Rendering", unit="vessel"):
+            fut.result()
 
     print(f"\u2713 Saved {len(keep)} survey vessels into {data_root.resolve()}")
 
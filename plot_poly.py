@@ -19,10 +19,24 @@ from pathlib import Path
 
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
 
 
+MAX_PLOT_POINTS = 2000                   # vertices per track sent to matplotlib
+
+
+def decimate(lons: np.ndarray, lats: np.ndarray, max_points: int = MAX_PLOT_POINTS):
+    """Evenly strided subset of a long track (first and last fix kept); at figure
+    resolution the dropped vertices land on the same pixels anyway."""
+    if len(lons) <= max_points:
+        return lons, lats
+    idx = np.linspace(0, len(lons) - 1, max_points).astype(int)
+    return lons[idx], lats[idx]
+
+
 def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Plot polyline .npy dataset on world map.")
     p.add_argument("npy", help=".npy file created by make_polyline_dataset script")
@@ -50,13 +64,21 @@ def main() -> None:
     # colour cycle
     colours = itertools.cycle(plt.rcParams["axes.prop_cycle"].by_key()["color"])
 
-    for idx, track in enumerate(polys, 1):
-        lats, lons = zip(*track)
-        ax.plot(lons, lats, linewidth=1.2, alpha=0.8,
-                transform=proj, color=next(colours), label=f"poly {idx}")
+    # one LineCollection (a single artist / draw call) instead of a Line2D per track
+    segs, colors = [], []
+    for track in polys:
+        arr = np.asarray(track, dtype=np.float32)        # (n, 2) of (lat, lon)
+        lons, lats = decimate(arr[:, 1], arr[:, 0])
+        segs.append(np.column_stack((lons, lats)))
+        colors.append(next(colours))
+    ax.add_collection(LineCollection(segs, colors=colors, linewidths=1.2, alpha=0.8,
+                                     transform=proj))
 
     ax.set_title(f"{len(polys)} polylines from {npy_path.name}", fontsize=13)
-    ax.legend(fontsize=7, loc="lower left")
+    # legend entries from proxy lines; they are never drawn on the map
+    handles = [Line2D([], [], linewidth=1.2, alpha=0.8, color=c, label=f"poly {idx}")
+               for idx, c in enumerate(colors, 1)]
+    ax.legend(handles=handles, fontsize=7, loc="lower left")
 
     if args.out:
         fig.savefig(args.out, dpi=150, bbox_inches="tight")
@@ -15,7 +15,9 @@ import argparse
 from pathlib import Path
 
 import matplotlib.pyplot as plt
-import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.compute as pc
 
 
 def parse_args() -> argparse.Namespace:
@@ -29,12 +31,15 @@ def parse_args() -> argparse.Namespace:
 def main() -> None:
     args = parse_args()
 
-    # 1. load – pandas handles >100-column AIS dumps fine
-    df = pd.read_csv(args.csv, low_memory=False)
+    # 1. load – only the columns we need out of the >100-column AIS dump
+    tbl = pacsv.read_csv(args.csv, convert_options=pacsv.ConvertOptions(
+        include_columns=["VesselName", "LAT", "LON"],
+        column_types={"VesselName": pa.string()},
+    ))
 
-    # 2. filter rows whose VesselName contains 'SURVEYOR'
-    mask = df["VesselName"].str.contains("SURVEYOR", case=False, na=False)
-    surveyor_df = df.loc[mask, ["LAT", "LON"]]
+    # 2. filter rows whose VesselName contains 'SURVEYOR' (null names drop out)
+    mask = pc.match_substring(tbl["VesselName"], "SURVEYOR", ignore_case=True)
+    surveyor_df = tbl.filter(mask).select(["LAT", "LON"]).to_pandas()
 
     if surveyor_df.empty:
         print("No rows with 'SURVEYOR' in VesselName found.")
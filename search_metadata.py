@@ -1,19 +1,28 @@
 #!/usr/bin/env python3
 
-import csv
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.compute as pc
 from tqdm import tqdm
 
-def find_ids(demo_data_dir: Path) -> set[str]:
-    """Collect vessel IDs from DemoData subfolders."""
-    ids = set()
+# stable per-vessel fields copied into metadata.json
+METADATA_FIELDS = ["VesselName", "IMO", "CallSign", "VesselType", "Length",
+                   "Width", "Draft", "Cargo", "TransceiverClass"]
+
+def find_ids(demo_data_dir: Path) -> dict[str, list[Path]]:
+    """Map vessel IDs to their folder(s) in DemoData subfolders."""
+    id_to_dirs: dict[str, list[Path]] = {}
     for subdir in demo_data_dir.iterdir():
         if subdir.is_dir():
             for vessel_dir in subdir.iterdir():
                 if vessel_dir.is_dir():
-                    ids.add(vessel_dir.name)
-    return ids
+                    id_to_dirs.setdefault(vessel_dir.name, []).append(vessel_dir)
+    return id_to_dirs
 
 def find_csv_files(*directories: Path) -> list[Path]:
     """Find all CSV files in given directories."""
@@ -22,40 +31,39 @@ def find_csv_files(*directories: Path) -> list[Path]:
         csv_files.extend(directory.rglob("*.csv"))
     return csv_files
 
-def process_csv(csv_path: Path, wanted_ids: set[str], collected: dict[str, dict]) -> None:
-    """Stream a CSV file and collect metadata for wanted IDs."""
-    with csv_path.open("r", newline='') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            mmsi = row["MMSI"]
-            if mmsi not in wanted_ids:
-                continue
-            if mmsi in collected:
+def process_csv(csv_path: Path, wanted_ids: set[str]) -> dict[str, dict]:
+    """Stream a CSV file and return metadata for the wanted IDs it contains (first row per ID)."""
+    found: dict[str, dict] = {}
+    remaining = set(wanted_ids)
+    # Arrow parses only the metadata columns (absent ones come back as nulls)
+    # and the MMSI membership test runs as one hash lookup kernel per block
+    reader = pacsv.open_csv(csv_path, convert_options=pacsv.ConvertOptions(
+        include_columns=["MMSI", *METADATA_FIELDS],
+        include_missing_columns=True,
+        column_types={c: pa.string() for c in ["MMSI", *METADATA_FIELDS]},
+    ))
+    for batch in reader:
+        mask = pc.is_in(batch.column("MMSI"), value_set=pa.array(list(remaining), pa.string()))
+        hits = batch.filter(mask)
+        # positional columns, no per-row dict: only the first row per MMSI is kept
+        for mmsi, *fields in zip(*(hits.column(c).to_pylist() for c in ["MMSI", *METADATA_FIELDS])):
+            if mmsi in found:
                 continue  # already found
 
             # collect stable fields
-            collected[mmsi] = {
-                "VesselName": row.get("VesselName", "").strip(),
-                "IMO": row.get("IMO", "").strip(),
-                "CallSign": row.get("CallSign", "").strip(),
-                "VesselType": row.get("VesselType", "").strip(),
-                "Length": row.get("Length", "").strip(),
-                "Width": row.get("Width", "").strip(),
-                "Draft": row.get("Draft", "").strip(),
-                "Cargo": row.get("Cargo", "").strip(),
-                "TransceiverClass": row.get("TransceiverClass", "").strip(),
-            }
+            found[mmsi] = {k: (v or "").strip() for k, v in zip(METADATA_FIELDS, fields)}
+            remaining.discard(mmsi)
+        if not remaining:
+            break  # early exit if all found
+    return found
 
-def save_metadata(demo_data_dir: Path, collected: dict[str, dict]) -> None:
-    """Save metadata.json into each corresponding vessel folder."""
-    for subdir in demo_data_dir.iterdir():
-        if subdir.is_dir():
-            for vessel_dir in subdir.iterdir():
-                if vessel_dir.is_dir():
-                    mmsi = vessel_dir.name
-                    if mmsi in collected:
-                        metadata_path = vessel_dir / "metadata.json"
-                        metadata_path.write_text(json.dumps(collected[mmsi], indent=2))
+def save_metadata(id_to_dirs: dict[str, list[Path]], collected: dict[str, dict]) -> None:
+    """Save metadata.json into each corresponding vessel folder (no second DemoData walk)."""
+    for mmsi, vessel_dirs in id_to_dirs.items():
+        if mmsi in collected:
+            for vessel_dir in vessel_dirs:
+                metadata_path = vessel_dir / "metadata.json"
+                metadata_path.write_text(json.dumps(collected[mmsi], indent=2))
 
 def main():
     # CONFIGURATION
@@ -64,7 +72,8 @@ def main():
     csv_dir_2 = Path("/Users/justin/Desktop/Hackathon/ais_2021_raw")  # <<< change me
 
     # Step 1: Gather vessel IDs
-    ids = find_ids(demo_data_dir)
+    id_to_dirs = find_ids(demo_data_dir)
+    ids = set(id_to_dirs)
     print(f"Found {len(ids)} vessel IDs.")
 
     # Step 2: Find all CSVs
@@ -72,16 +81,22 @@ def main():
     print(f"Found {len(csv_files)} CSV files.")
 
     # Step 3: Process CSVs
+    # Files are independent: parse them on all cores, merging in file order so
+    # the first file that mentions an MMSI still wins
     collected: dict[str, dict] = {}
-    for csv_path in tqdm(csv_files, desc="Processing CSVs"):
-        process_csv(csv_path, ids, collected)
-        if len(collected) == len(ids):
-            break  # early exit if all found
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        results = ex.map(partial(process_csv, wanted_ids=ids), csv_files)
+        for found in tqdm(results, total=len(csv_files), desc="Processing CSVs"):
+            for mmsi, meta in found.items():
+                collected.setdefault(mmsi, meta)
+            if len(collected) == len(ids):
+                ex.shutdown(cancel_futures=True)
+                break  # early exit if all found
 
     print(f"Collected metadata for {len(collected)} vessels.")
 
     # Step 4: Save metadata.json
-    save_metadata(demo_data_dir, collected)
+    save_metadata(id_to_dirs, collected)
     print("✓ Metadata saved.")
 
 if __name__ == "__main__":
@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
 
+import os
 from pathlib import Path
-import json
+import orjson
 
 def get_ids(folder: Path) -> set[str]:
     """Get set of vessel IDs (folder names) in a subfolder."""
-    return {f.name for f in folder.iterdir() if f.is_dir()}
+    # scandir entries carry the file type from the directory listing: no stat per entry
+    with os.scandir(folder) as it:
+        return {e.name for e in it if e.is_dir()}
 
 def main():
     # CONFIGURATION
@@ -46,8 +49,8 @@ def main():
     print(f"IDs unique to {folder3.name}: {len(unique_3)}")
 
     # (Optional) Save detailed lists if needed
-    (demo_data_dir / "id_analysis.json").write_text(
-        json.dumps({
+    (demo_data_dir / "id_analysis.json").write_bytes(
+        orjson.dumps({
             "unique_to_" + folder1.name: sorted(unique_1),
             "unique_to_" + folder2.name: sorted(unique_2),
             "unique_to_" + folder3.name: sorted(unique_3),
@@ -55,7 +58,7 @@ def main():
             "common_between_" + folder1.name + "_" + folder3.name: sorted(common_13),
             "common_between_" + folder2.name + "_" + folder3.name: sorted(common_23),
             "common_all_three": sorted(common_all),
-        }, indent=2)
+        }, option=orjson.OPT_INDENT_2)
     )
     print("\n✓ Detailed ID analysis saved to id_analysis.json.")
 
@@ -14,11 +14,16 @@ python unzip_ais.py --year 2022
 
 from __future__ import annotations
 import argparse
+import shutil
 import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 
 from tqdm import tqdm            # pip install tqdm
 
+COPY_BUFFER = 1024 * 1024        # 1 MiB per read/write while extracting
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Extract all ZIPs for a given year and delete originals."
@@ -35,7 +40,19 @@ def unzip_and_delete(zip_path: Path, out_root: Path) -> None:
 
     try:
         with zipfile.ZipFile(zip_path) as z:
-            z.extractall(dest)
+            # Stream each member out with 1 MiB copies instead of extractall's
+            # per-member path handling and small copy buffer
+            root    = dest.resolve()
+            members = [(info, (dest / info.filename).resolve())
+                       for info in z.infolist() if not info.is_dir()]
+            for info, target in members:
+                if root not in target.parents:
+                    raise zipfile.BadZipFile(f"member escapes {dest}: {info.filename}")
+            for folder in {target.parent for _, target in members}:
+                folder.mkdir(parents=True, exist_ok=True)
+            for info, target in members:
+                with z.open(info) as src, open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst, COPY_BUFFER)
         zip_path.unlink()                     # delete after success
         tqdm.write(f"[ OK ] {zip_path.name}")
     except (zipfile.BadZipFile, OSError) as e:
@@ -52,8 +69,10 @@ def main() -> None:
         print(f"No .zip files found in {zip_dir}")
         return
 
-    for zp in tqdm(zips, desc="Unzip + delete", unit="zip"):
-        unzip_and_delete(zp, out_root)
+    # Archives are independent and inflating is CPU-bound: one per core
+    with ProcessPoolExecutor() as ex:
+        list(tqdm(ex.map(partial(unzip_and_delete, out_root=out_root), zips),
+                  total=len(zips), desc="Unzip + delete", unit="zip"))
 
 if __name__ == "__main__":
     main()